@@ -1,15 +1,24 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, Response
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
 from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
 import smtplib
 from email.message import EmailMessage
 import os
+import time
 from dotenv import load_dotenv
 import pandas as pd
-import pickle
-from datetime import datetime
-import requests
+from datetime import datetime, timedelta, timezone
+from upstream_client import get_client
+from model_registry import ModelRegistry, parse_preload_setting
+from model_store import open_store
+from forecast_grid import ForecastGrid
+from usage_cube import UsageCube
+from upstream_cache import SnapshotCache
+from weather_forecast import ForecastIndex
+from station_snapshot import StationSnapshot, SUPPORTED_ENCODINGS
+from station_stream import StationStream
 
 # Loading environment variables from .env file.
 load_dotenv()
@@ -147,46 +156,91 @@ def logout():
     return redirect(url_for("home"))
 
 # Bike Prediction Backend.
-avg_usage_df = pd.read_csv("static/station_avg_usage.csv")
+# Historical average docks indexed by [station, weekday, hour], reloaded when the CSV is regenerated.
+avg_usage = UsageCube.from_csv("static/station_avg_usage.csv")
+
+# Station models are cached in memory, bounded by MODEL_CACHE_SIZE (models) and MODEL_CACHE_MB (on-disk size).
+# The shared memory-mapped MODEL_STORE (see model_store.py) is used first, then compiled forests
+# in COMPILED_MODEL_DIR (see forest_engine.py), then the pickles.
+model_registry = ModelRegistry(
+    "station_models",
+    compiled_dir=os.getenv("COMPILED_MODEL_DIR", "compiled_models"),
+    store=open_store(os.getenv("MODEL_STORE", "station_models.bin")),
+    max_models=int(os.getenv("MODEL_CACHE_SIZE", "32")) or None,
+    max_bytes=int(float(os.getenv("MODEL_CACHE_MB", "0")) * 1024 * 1024) or None,
+)
+
+# Optionally warm the cache at startup with MODEL_PRELOAD="all" or a list of station ids.
+preload_setting = parse_preload_setting(os.getenv("MODEL_PRELOAD"))
+if preload_setting == "all":
+    model_registry.warm_up()
+elif preload_setting:
+    model_registry.warm_up(preload_setting)
 
 # Load the machine learning model for a specific station.
 def load_station_model(station_id):
-    model_path = os.path.join("station_models", f"station_{station_id}.pkl")
-    if not os.path.exists(model_path):
-        raise FileNotFoundError(f"Station ID {station_id} does not exist.")
-    with open(model_path, "rb") as file:
-        return pickle.load(file)
+    return model_registry.get(station_id)
 
-# Get weather forecast for Dublin on a specific date.
-def get_weather_forecast_dublin(date):
+# Pooled clients for the upstream APIs, with timeouts, retries and circuit breakers.
+jcdecaux_client = get_client("jcdecaux")
+openweathermap_client = get_client("openweathermap")
+
+# Fetch the 5-day/3-hour weather forecast for Dublin.
+def fetch_weather_forecast_dublin():
     api_key = os.getenv("OPENWEATHERMAP_API_KEY")
     lat, lon = 53.3498, -6.2603
     url = f"https://api.openweathermap.org/data/2.5/forecast?lat={lat}&lon={lon}&appid={api_key}&units=metric"
-    response = requests.get(url)
+    response = openweathermap_client.get(url)
     data = response.json()
+    return data["list"]
 
-    target_date = datetime.strptime(date, "%Y-%m-%d")
-    closest = min(
-        data["list"],
-        key=lambda x: abs(datetime.fromtimestamp(x["dt"]) - target_date)
-    )
+# Shared weather forecast, indexed for binary-search lookups and refetched every WEATHER_CACHE_TTL seconds.
+weather_forecast_cache = SnapshotCache(
+    lambda: ForecastIndex.from_forecast(fetch_weather_forecast_dublin()),
+    ttl=float(os.getenv("WEATHER_CACHE_TTL", "1800")),
+    stale_ttl=float(os.getenv("WEATHER_CACHE_STALE_TTL", "10800")),
+    name="openweathermap",
+)
 
-    return {
-        "temperature": closest["main"]["temp"],
-        "humidity": closest["main"]["humidity"],
-    }
+# Get the cached, indexed weather forecast.
+def get_weather_forecast_index():
+    return weather_forecast_cache.get().value
+
+# Get weather forecast for Dublin on a specific date.
+def get_weather_forecast_dublin(date):
+    return get_weather_forecast_index().closest_date(date)
 
 # Fetch live bike data for all stations in Dublin.
 def fetch_live_bike_data_dublin():
     api_key = os.getenv("JCDECAUX_API_KEY")
     url = f"https://api.jcdecaux.com/vls/v1/stations?contract=Dublin&apiKey={api_key}"
-    response = requests.get(url)
+    response = jcdecaux_client.get(url)
     if response.status_code != 200:
         raise Exception(f"API request failed: {response.status_code}")
     return response.json()
 
+# Shared JCDecaux snapshot: served from memory for BIKE_CACHE_TTL seconds, then served stale while one
+# background fetch revalidates it, until BIKE_CACHE_STALE_TTL. Concurrent misses share a single fetch.
+bike_snapshot_cache = SnapshotCache(
+    lambda: StationSnapshot(fetch_live_bike_data_dublin()),
+    ttl=float(os.getenv("BIKE_CACHE_TTL", "120")),
+    stale_ttl=float(os.getenv("BIKE_CACHE_STALE_TTL", "600")),
+    name="jcdecaux",
+)
+
+# Get the cached live bike snapshot.
+def get_live_bike_snapshot():
+    return bike_snapshot_cache.get()
+
+# Add the age of the bike snapshot a response was built from.
+def with_snapshot_age(response, snapshot):
+    response.headers["X-Snapshot-Age"] = str(int(time.time() - snapshot.fetched_at))
+    return response
+
 # Extract available docks for a specific station from live data.
 def get_station_available_docks(station_id, bike_data):
+    if isinstance(bike_data, StationSnapshot):
+        return bike_data.available_docks(station_id)
     for station in bike_data:
         if station['number'] == station_id:
             return station['available_bike_stands']
@@ -194,33 +248,79 @@ def get_station_available_docks(station_id, bike_data):
 
 # Get historical average docks for a station given day and hour.
 def get_historical_average_docks(station_id, day_name, hour):
-    row = avg_usage_df[
-        (avg_usage_df['station_id'] == station_id) &
-        (avg_usage_df['day_name'] == day_name) &
-        (avg_usage_df['hour'] == hour)
-    ]
-    if not row.empty:
-        return int(row['avg_docks'].values[0])
-    return 0
+    avg_usage.reload_if_changed()
+    return avg_usage.get(station_id, day_name, hour)
 
-# Predict bike availability for a specific station, date, and time.
-def predict_bike_availability(station_id, date_str, time_str):
-    model = load_station_model(station_id)
+# Feature columns in the order the station models were trained on.
+FEATURE_COLUMNS = ['num_docks_available', 'day', 'hour', 'avg_air_temp', 'avg_humidity', 'day_name']
+
+# Predictions within this many seconds use live dock data, later ones use historical averages.
+LIVE_DATA_HORIZON = 6 * 3600
 
+# Parse the date and time strings accepted by the prediction endpoints.
+def parse_prediction_datetime(date_str, time_str):
     try:
-        date_time = datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %H:%M:%S")
+        return datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %H:%M:%S")
     except ValueError:
-        date_time = datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %H:%M")
+        return datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %H:%M")
+
+# Build one model input row.
+def build_feature_row(available_docks, date_time, weather_features):
+    return {
+        'num_docks_available': available_docks,
+        'day': date_time.day,
+        'hour': date_time.hour,
+        'avg_air_temp': weather_features['temperature'],
+        'avg_humidity': weather_features['humidity'],
+        'day_name': date_time.weekday()
+    }
+
+# Whether a prediction time is close enough to use live dock data.
+def uses_live_data(date_time, now=None):
+    now = now or datetime.now()
+    return (date_time - now).total_seconds() < LIVE_DATA_HORIZON
+
+# Thread pool for overlapping the model load and upstream fetches of a single prediction.
+io_pool = ThreadPoolExecutor(max_workers=int(os.getenv("PREDICT_IO_THREADS", "8")), thread_name_prefix="predict-io")
+PREDICT_CONCURRENT = os.getenv("PREDICT_CONCURRENT", "1") == "1"
+
+# Load the model and fetch weather and bike data concurrently, so latency is the slowest of the three.
+# Results are collected in the sequential order, so the same error is raised first as before.
+def gather_prediction_inputs_concurrently(station_id, date_str, time_str):
+    model_future = io_pool.submit(load_station_model, station_id)
+    try:
+        date_time = parse_prediction_datetime(date_str, time_str)
+    except ValueError:
+        model_future.result()
+        raise
+
+    weather_future = io_pool.submit(get_weather_forecast_dublin, date_str)
+    bike_future = io_pool.submit(get_live_bike_snapshot) if uses_live_data(date_time) else None
+
+    model = model_future.result()
+    weather_features = weather_future.result()
+    bike_data = bike_future.result().value if bike_future is not None else None
+    return model, date_time, weather_features, bike_data
+
+# Predict bike availability for a specific station, date, and time.
+def predict_bike_availability(station_id, date_str, time_str, concurrent=None):
+    if concurrent is None:
+        concurrent = PREDICT_CONCURRENT
 
-    now = datetime.now()
-    time_diff = date_time - now
+    if concurrent:
+        model, date_time, weather_features, bike_data = gather_prediction_inputs_concurrently(
+            station_id, date_str, time_str
+        )
+    else:
+        model = load_station_model(station_id)
+        date_time = parse_prediction_datetime(date_str, time_str)
 
-    # Get weather features for input.
-    weather_features = get_weather_forecast_dublin(date_str)
+        # Get weather features for input.
+        weather_features = get_weather_forecast_dublin(date_str)
+        bike_data = get_live_bike_snapshot().value if uses_live_data(date_time) else None
 
     # Use live data if prediction is within next 6 hours otherwise use average dock data.
-    if time_diff.total_seconds() < 6 * 3600:
-        bike_data = fetch_live_bike_data_dublin()
+    if bike_data is not None:
         available_docks = get_station_available_docks(station_id, bike_data)
     else:
         available_docks = get_historical_average_docks(
@@ -228,19 +328,109 @@ def predict_bike_availability(station_id, date_str, time_str):
         )
 
     # Prepare input data for model prediction.
-    input_data = pd.DataFrame([{
-        'num_docks_available': available_docks,
-        'day': date_time.day,
-        'hour': date_time.hour,
-        'avg_air_temp': weather_features['temperature'],
-        'avg_humidity': weather_features['humidity'],
-        'day_name': date_time.weekday()
-    }])
+    input_data = pd.DataFrame([build_feature_row(available_docks, date_time, weather_features)])
 
     # Predict available bikes.
     prediction = model.predict(input_data)
     return int(prediction[0])
 
+# Predict bike availability for many (station_id, datetime) pairs at once.
+# Upstream data is fetched once and each station model is called once on a stacked feature matrix.
+def predict_bike_availability_batch(items, now=None):
+    now = now or datetime.now()
+    results = [None] * len(items)
+
+    forecast = get_weather_forecast_index()
+
+    # Live docks come from the shared snapshot cache, the same snapshot the forecast grid is keyed on.
+    bike_data = None
+    if any(uses_live_data(date_time, now) for _, date_time in items):
+        bike_data = get_live_bike_snapshot().value
+
+    # Historical docks for every row in one vectorised lookup.
+    avg_usage.reload_if_changed()
+    historical_docks = avg_usage.get_many(
+        [station_id for station_id, _ in items],
+        [date_time.weekday() for _, date_time in items],
+        [date_time.hour for _, date_time in items],
+    )
+
+    # Weather is looked up per distinct date (midnight, as in predict_bike_availability) in one vectorised search.
+    dates = sorted({date_time.strftime("%Y-%m-%d") for _, date_time in items})
+    weather_by_date = dict(zip(dates, forecast.closest_many([datetime.strptime(d, "%Y-%m-%d") for d in dates])))
+
+    # Group row positions by station so every model is loaded and evaluated once.
+    rows_by_station = {}
+    for position, (station_id, date_time) in enumerate(items):
+        date_str = date_time.strftime("%Y-%m-%d")
+
+        if uses_live_data(date_time, now):
+            available_docks = bike_data.available_docks(station_id)
+        else:
+            available_docks = int(historical_docks[position])
+
+        row = build_feature_row(available_docks, date_time, weather_by_date[date_str])
+        rows_by_station.setdefault(station_id, []).append((position, row))
+
+    for station_id, rows in rows_by_station.items():
+        try:
+            model = load_station_model(station_id)
+        except FileNotFoundError as e:
+            for position, _ in rows:
+                results[position] = {"error": str(e)}
+            continue
+
+        input_data = pd.DataFrame([row for _, row in rows], columns=FEATURE_COLUMNS)
+        predictions = model.predict(input_data)
+        for (position, _), prediction in zip(rows, predictions):
+            results[position] = {"predicted_available_bikes": int(prediction)}
+
+    for (station_id, date_time), result in zip(items, results):
+        result["station_id"] = station_id
+        result["date"] = date_time.strftime("%Y-%m-%d")
+        result["time"] = date_time.strftime("%H:%M:%S")
+    return results
+
+# Largest number of rows a single batch request may ask for.
+MAX_BATCH_ROWS = int(os.getenv("MAX_BATCH_ROWS", "5000"))
+
+# Turn a /predict_batch request body into (station_id, datetime) pairs.
+# Either an explicit "items" list, or a "start"/"end" window (optionally "step_minutes" and "station_ids").
+def parse_batch_request(body):
+    if "items" in body:
+        return [
+            (int(item["station_id"]), parse_prediction_datetime(item["date"], item["time"]))
+            for item in body["items"]
+        ]
+
+    start = datetime.strptime(body["start"], "%Y-%m-%d %H:%M")
+    end = datetime.strptime(body["end"], "%Y-%m-%d %H:%M")
+    step = timedelta(minutes=int(body.get("step_minutes", 60)))
+    if step.total_seconds() <= 0:
+        raise ValueError("step_minutes must be positive")
+    station_ids = body.get("station_ids") or model_registry.available_station_ids()
+
+    date_times = []
+    date_time = start
+    while date_time <= end:
+        date_times.append(date_time)
+        date_time += step
+        if len(date_times) * len(station_ids) > MAX_BATCH_ROWS:
+            break
+    return [(int(station_id), date_time) for station_id in station_ids for date_time in date_times]
+
+# Predictions for every station for the next 48 hours, refreshed in the background when FORECAST_GRID=1.
+forecast_grid = ForecastGrid(
+    predict_bike_availability_batch,
+    model_registry.available_station_ids,
+    hours=int(os.getenv("FORECAST_GRID_HOURS", "48")),
+    live_horizon=LIVE_DATA_HORIZON,
+    refresh_seconds=int(os.getenv("FORECAST_GRID_REFRESH", "900")),
+    source_version=lambda: (get_live_bike_snapshot().version, weather_forecast_cache.get().version),
+)
+if os.getenv("FORECAST_GRID") == "1":
+    forecast_grid.start()
+
 # API endpoint to get predicted bike availability.
 @app.route("/predict", methods=["GET"])
 @login_required
@@ -253,29 +443,61 @@ def predict():
         if not all([station_id, date_str, time_str]):
             return {"error": "Missing required parameters"}, 400
 
+        # Answer from the precomputed grid when possible, otherwise run live inference.
+        date_time = parse_prediction_datetime(date_str, time_str)
+        prediction = forecast_grid.lookup(int(station_id), date_time)
+        if prediction is not None:
+            return jsonify({"predicted_available_bikes": prediction, "source": "grid"})
+
         prediction = predict_bike_availability(int(station_id), date_str, time_str)
-        return jsonify({"predicted_available_bikes": prediction})
+        return jsonify({"predicted_available_bikes": prediction, "source": "live"})
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# API endpoint to get predicted bike availability for many stations and times in one request.
+@app.route("/predict_batch", methods=["POST"])
+@login_required
+def predict_batch():
+    body = request.get_json(silent=True)
+    if not body or not ("items" in body or ("start" in body and "end" in body)):
+        return jsonify({"error": "Provide either 'items' or 'start' and 'end'"}), 400
+
+    try:
+        items = parse_batch_request(body)
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid request: {e}"}), 400
+
+    if len(items) > MAX_BATCH_ROWS:
+        return jsonify({"error": f"Batch is limited to {MAX_BATCH_ROWS} predictions"}), 400
+
+    try:
+        return jsonify({"predictions": predict_bike_availability_batch(items)})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 # API endpoint to fetch live station list for predictions.
 @app.route("/stations", methods=["GET"])
 @login_required
 def get_stations():
     try:
-        data = fetch_live_bike_data_dublin()
-        station_list = [
-            {
-                "name": s["name"],
-                "id": s["number"],
-                "status": s["status"]
-            }
-            for s in data]
-        return jsonify(station_list)
+        snapshot = get_live_bike_snapshot()
+        response = Response(snapshot.value.stations_json, mimetype="application/json")
+        return with_snapshot_age(response, snapshot)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# API endpoint exposing model cache counters.
+@app.route("/model_stats", methods=["GET"])
+@login_required
+def model_stats():
+    stats = model_registry.stats()
+    stats["forecast_grid"] = forecast_grid.stats()
+    stats["bike_snapshot_cache"] = bike_snapshot_cache.stats()
+    stats["weather_forecast_cache"] = weather_forecast_cache.stats()
+    stats["station_stream"] = station_stream.stats()
+    return jsonify(stats)
+
 # Route to fetch live weather data.
 @app.route("/get_live_weather", methods=["GET"])
 def get_live_weather():
@@ -284,7 +506,7 @@ def get_live_weather():
     url = f"http://api.openweathermap.org/data/2.5/weather?q={city}&units=metric&appid={api_key}"
     
     try:
-        response = requests.get(url)
+        response = openweathermap_client.get(url)
         data = response.json()
         
         if response.status_code == 200:
@@ -295,18 +517,69 @@ def get_live_weather():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-# Route to fetch live station data.
+# Build a cacheable, compressed /stations_list response, or a 304 when the client already has it.
+def station_list_response(snapshot, format):
+    stations = snapshot.value
+    etag = f"{stations.etag}-{format}"
+    modified = stations.last_modified or snapshot.fetched_at
+    last_modified = datetime.fromtimestamp(int(modified), timezone.utc)
+
+    response = Response(mimetype="application/json")
+    response.set_etag(etag, weak=True)
+    response.last_modified = last_modified
+    response.cache_control.public = True
+    response.cache_control.max_age = max(0, int(bike_snapshot_cache.ttl - (time.time() - snapshot.fetched_at)))
+    response.vary.add("Accept-Encoding")
+    with_snapshot_age(response, snapshot)
+
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains_weak(etag)
+    else:
+        not_modified = request.if_modified_since is not None and request.if_modified_since >= last_modified
+    if not_modified:
+        response.status_code = 304
+        return response
+
+    encoding = request.accept_encodings.best_match(SUPPORTED_ENCODINGS)
+    response.set_data(stations.encoded(format, encoding))
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    return response
+
+# Route to fetch live station data. "?format=compact" returns only the fields the map uses, as columns.
 @app.route("/stations_list", methods=["GET"])
 def get_stations_list():
-    JCDECAUX_API_KEY = os.getenv("JCDECAUX_API_KEY")
-    url = f"https://api.jcdecaux.com/vls/v1/stations?contract=dublin&apiKey={JCDECAUX_API_KEY}"
+    format = request.args.get("format", "full")
+    if format not in ("full", "compact"):
+        return jsonify({"error": "format must be 'full' or 'compact'"}), 400
     try:
-        response = requests.get(url)
-        data = response.json()
-        return jsonify(data)
+        return station_list_response(get_live_bike_snapshot(), format)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# One poller shared by every /stations_stream client; it starts with the first subscriber.
+station_stream = StationStream(
+    get_live_bike_snapshot,
+    poll_seconds=int(os.getenv("STATION_STREAM_POLL", "30")),
+    buffer_size=int(os.getenv("STATION_STREAM_BUFFER", "256")),
+)
+
+# Server-Sent Events stream of station availability. The first event is the full compact station list
+# (or the deltas missed since Last-Event-ID); after that only stations whose availability or status changed.
+@app.route("/stations_stream", methods=["GET"])
+def stations_stream():
+    try:
+        get_live_bike_snapshot()
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+    last_id = StationStream.parse_last_event_id(
+        request.headers.get("Last-Event-ID") or request.args.get("last_event_id"))
+    response = Response(station_stream.subscribe(last_id), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
 # Run the app.
 if __name__ == "__main__":
     with app.app_context():
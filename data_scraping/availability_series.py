@@ -0,0 +1,73 @@
+import argparse
+import pandas as pd
+
+# Columns of the availability table, without its auto-increment id.
+COLUMNS = ["number", "available_bikes", "available_bike_stands", "status", "last_update"]
+
+# Change rows in [start, end] plus, per station, the last row at or before start, which carries
+# the state the station was already in when the window opened.
+CHANGES_QUERY = """
+    SELECT a.number, a.available_bikes, a.available_bike_stands, a.status, a.last_update
+    FROM availability a
+    JOIN (
+        SELECT number, MAX(last_update) AS last_update
+        FROM availability
+        WHERE last_update <= %s
+        GROUP BY number
+    ) seed ON seed.number = a.number AND seed.last_update = a.last_update
+    UNION ALL
+    SELECT number, available_bikes, available_bike_stands, status, last_update
+    FROM availability
+    WHERE last_update > %s AND last_update <= %s
+"""
+
+# Read the change rows needed to rebuild [start, end] from the availability table of a storage backend.
+def load_changes(storage, start, end):
+    _, rows = storage.query(CHANGES_QUERY, (start, start, end))
+    return pd.DataFrame(rows, columns=COLUMNS)
+
+# Rebuild a regular series from change rows (as written by the bike scraper's change-data-capture mode):
+# one row per station per `freq` between start and end, each carrying the latest observation at or before
+# that time. Times before a station's first observation are left out.
+def reconstruct_series(changes, start, end, freq="5min", station_ids=None):
+    changes = changes.copy()
+    changes["last_update"] = pd.to_datetime(changes["last_update"])
+    changes = changes.sort_values("last_update", kind="stable")
+
+    if station_ids is None:
+        station_ids = sorted(changes["number"].unique())
+    times = pd.date_range(pd.Timestamp(start), pd.Timestamp(end), freq=freq)
+    grid = pd.DataFrame({
+        "number": [station_id for station_id in station_ids for _ in times],
+        "last_update": list(times) * len(station_ids),
+    }).sort_values("last_update", kind="stable")
+
+    series = pd.merge_asof(
+        grid, changes.rename(columns={"last_update": "observed_at"}),
+        left_on="last_update", right_on="observed_at", by="number", direction="backward",
+    )
+    series = series.dropna(subset=["observed_at"])
+    for column in ("available_bikes", "available_bike_stands"):
+        series[column] = series[column].astype(int)
+    return series.sort_values(["number", "last_update"], kind="stable")[COLUMNS].reset_index(drop=True)
+
+# Command line: write the regular series for a time window to CSV, in the layout of the availability export.
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild a regular availability series from change rows.")
+    parser.add_argument("--start", required=True, help='e.g. "2025-04-14 00:00:00"')
+    parser.add_argument("--end", required=True, help='e.g. "2025-04-15 00:00:00"')
+    parser.add_argument("--freq", default="5min", help="sampling interval as a pandas frequency (default 5min)")
+    parser.add_argument("--out", default="availability_series.csv")
+    args = parser.parse_args()
+
+    from bike_scraper import storage
+    try:
+        series = reconstruct_series(load_changes(storage, args.start, args.end), args.start, args.end, args.freq)
+    finally:
+        storage.close()
+    series["last_update"] = series["last_update"].dt.strftime('%Y-%m-%d %H:%M:%S')
+    series.to_csv(args.out, index=False)
+    print(f"Wrote {len(series)} rows to {args.out}.")
+
+if __name__ == "__main__":
+    main()
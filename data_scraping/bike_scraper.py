@@ -1,164 +1,237 @@
-import requests
 import json
 import datetime
 import time
-import mysql.connector
+import os
+import sys
 import dbinfo               # dbinfo contains important and sensitive information such as host, database, user, password, and API key.
-
-# Connect to MySQL database
-def get_db_connection():
-    try:
-        conn = mysql.connector.connect(
-            host=dbinfo.DB_HOST,
-            database=dbinfo.DB_NAME,
-            user=dbinfo.DB_USER,
-            password=dbinfo.DB_PASSWORD
-        )
-        return conn
-    except Exception as e:
-        print(f"Database connection error: {e}")
-        return None
-
-# Ensures required tables exist
+from usage_aggregator import DEFAULT_SEED_WEIGHT, open_aggregator
+from scheduler import Job, run_jobs
+from spool import Spool
+
+# Shared modules live in the repository root.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from upstream_client import get_client
+from storage import storage_from_config
+
+# Pooled client with timeouts, retries and a circuit breaker.
+jcdecaux_client = get_client("jcdecaux")
+
+# Optional incremental upkeep of the historical averages used by the app when predicting more than 6 hours ahead.
+# Set USAGE_CSV in dbinfo (e.g. to "../static/station_avg_usage.csv") to enable it.
+USAGE_CSV = getattr(dbinfo, "USAGE_CSV", None)
+USAGE_STATE = getattr(dbinfo, "USAGE_STATE", "usage_state.npz")
+USAGE_HALF_LIFE_HOURS = getattr(dbinfo, "USAGE_HALF_LIFE_HOURS", None)
+USAGE_PERSIST_EVERY = getattr(dbinfo, "USAGE_PERSIST_EVERY", 12)
+USAGE_SEED_WEIGHT = getattr(dbinfo, "USAGE_SEED_WEIGHT", DEFAULT_SEED_WEIGHT)
+
+# Seconds between fetches.
+POLL_SECONDS = getattr(dbinfo, "POLL_SECONDS", 5 * 60)
+
+# Change-data-capture mode: store an availability row only when a station's counts or status changed,
+# stamped with the feed's own last_update. "availability_series.py" rebuilds the regular series from these rows.
+AVAILABILITY_CHANGES_ONLY = getattr(dbinfo, "AVAILABILITY_CHANGES_ONLY", False)
+
+# Local write-ahead spool every cycle is written to before the database, the rows per batch when draining it,
+# and how many flushes a row rejected for its data gets before it is moved to the dead letter table.
+SPOOL_PATH = getattr(dbinfo, "SPOOL_PATH", "bike_spool.sqlite3")
+SPOOL_BATCH_ROWS = getattr(dbinfo, "SPOOL_BATCH_ROWS", 5000)
+SPOOL_MAX_ATTEMPTS = getattr(dbinfo, "SPOOL_MAX_ATTEMPTS", 3)
+
+# Database the scraper writes to: STORAGE_URL in dbinfo (e.g. "sqlite:///bikes.db"), otherwise MySQL with the DB_* settings
+storage = storage_from_config(dbinfo)
+
+# Ensures required tables exist. Rows are spooled either way, so a database that is down at start-up is not fatal.
 def ensure_tables():
-    conn = get_db_connection()
-    if conn:
-        cur = conn.cursor()
-
-        # Create the table for stations if it doesn't already exist
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS station (
-                number INT PRIMARY KEY,
-                contract_name VARCHAR(50),
-                name VARCHAR(100),
-                address VARCHAR(255),
-                banking BOOLEAN,
-                bonus BOOLEAN,
-                bike_stands INT,
-                lat FLOAT,
-                lng FLOAT,
-                status VARCHAR(20)
-            );
-        """)
-
-        # Create the table for availability if it doesn't already exist
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS availability (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                number INT,
-                available_bikes INT,
-                available_bike_stands INT,
-                status VARCHAR(20),
-                last_update TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (number) REFERENCES station(number)
-            );
-        """)
-
-        conn.commit()
-        cur.close()
-        conn.close()
-
-        current_timestamp = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        print(f"Tables checked/created at {current_timestamp}.")
-
-# Store station data
-def store_station_metadata(station):
-    conn = get_db_connection()
-    if not conn:
-        return
-
-    try:
-        cur = conn.cursor()
-
-        # Insert/update station data
-        cur.execute("""
-            INSERT INTO station (number, contract_name, name, address, banking, bonus, bike_stands, lat, lng, status)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE
-            contract_name = VALUES(contract_name),
-            name = VALUES(name),
-            address = VALUES(address),
-            banking = VALUES(banking),
-            bonus = VALUES(bonus),
-            bike_stands = VALUES(bike_stands),
-            lat = VALUES(lat),
-            lng = VALUES(lng),
-            status = VALUES(status);
-        """, (
-            station["number"],
-            dbinfo.NAME,
-            station["name"],
-            station["address"],
-            station["banking"],
-            station["bonus"],
-            station["bike_stands"],
-            station["position"]["lat"],
-            station["position"]["lng"],
-            station["status"]
-        ))
-
-        conn.commit()
-        cur.close()
-        conn.close()
-    except Exception as e:
-        print(f"Error storing station metadata: {e}")
-
-# Store real time availability data
-def store_availability(station):
-    conn = get_db_connection()
-    if not conn:
-        return
-
     try:
-        cur = conn.cursor()
-
-        # Current timestamp
+        storage.ensure_tables(["station", "availability"])
         current_timestamp = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-
-        # Insert availability data with timestamp
-        cur.execute("""
-            INSERT INTO availability (number, available_bikes, available_bike_stands, status, last_update)
-            VALUES (%s, %s, %s, %s, %s);
-        """, (
-            station["number"],
-            station["available_bikes"],
-            station["available_bike_stands"],
-            station["status"],
-            current_timestamp
-        ))
-
-        conn.commit()
-        cur.close()
-        conn.close()
+        print(f"Tables checked/created at {current_timestamp}.")
     except Exception as e:
-        print(f"Error storing availability data: {e}")
-
-# Fetch and store data every 5 minutes
-def main():
+        print(f"Database error while checking tables: {e}")
+
+# Parameters of one station row
+def station_metadata_row(station):
+    return (
+        station["number"],
+        dbinfo.NAME,
+        station["name"],
+        station["address"],
+        station["banking"],
+        station["bonus"],
+        station["bike_stands"],
+        station["position"]["lat"],
+        station["position"]["lng"],
+        station["status"]
+    )
+
+# Parameters of one availability row
+def availability_row(station, timestamp):
+    return (
+        station["number"],
+        station["available_bikes"],
+        station["available_bike_stands"],
+        station["status"],
+        timestamp
+    )
+
+# Last station row written per station number. Station metadata rarely changes, so a station is
+# only upserted again when its row differs from this fingerprint (and always after a restart).
+metadata_fingerprints = {}
+
+# Stations whose metadata row differs from the last one written
+def changed_station_rows(stations, fingerprints):
+    rows = [station_metadata_row(station) for station in stations]
+    return [row for row in rows if fingerprints.get(row[0]) != row]
+
+# Last stored observation per station number in change-data-capture mode: (last_update in ms, values).
+availability_state = {}
+
+# Feed last_update (milliseconds since the epoch) as a local timestamp string like the availability table uses
+def feed_timestamp(last_update):
+    return datetime.datetime.fromtimestamp(last_update / 1000).strftime('%Y-%m-%d %H:%M:%S')
+
+# New observations only: stations whose feed last_update moved forward and whose counts or status changed.
+# A station the feed sends without a last_update is timed by the cycle timestamp instead, so it is still
+# recorded (when first seen and whenever its values change). Returns the rows to spool and the state entries
+# to record once they are spooled.
+def changed_availability_rows(stations, state, timestamp=None):
+    timestamp = timestamp or datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    cycle_ms = int(datetime.datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S').timestamp() * 1000)
+    rows, updates = [], {}
+    for station in stations:
+        last_update = station.get("last_update") or cycle_ms
+        values = (station["available_bikes"], station["available_bike_stands"], station["status"])
+        previous = state.get(station["number"])
+        if previous is not None and (last_update <= previous[0] or values == previous[1]):
+            continue
+        rows.append(availability_row(station, feed_timestamp(last_update)))
+        updates[station["number"]] = (last_update, values)
+    return rows, updates
+
+# Spool opened on first use
+_spool = None
+
+def get_spool():
+    global _spool
+    if _spool is None:
+        _spool = Spool(SPOOL_PATH, SPOOL_MAX_ATTEMPTS)
+    return _spool
+
+# Spool one fetched snapshot: upserts for stations whose metadata changed and the availability rows,
+# in one local transaction. Availability is every station stamped with timestamp, or with changes_only
+# just the new observations. Once spooled the rows are safe, so fingerprints and availability state are
+# updated straight away (and dropped again by forget_dead_letter for a row the database never accepts).
+# Returns the counts of rows spooled and skipped.
+def store_snapshot(spool, stations, timestamp=None, fingerprints=None, changes_only=None, state=None):
+    timestamp = timestamp or datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    fingerprints = metadata_fingerprints if fingerprints is None else fingerprints
+    changes_only = AVAILABILITY_CHANGES_ONLY if changes_only is None else changes_only
+    state = availability_state if state is None else state
+
+    station_rows = changed_station_rows(stations, fingerprints)
+    if changes_only:
+        availability_rows, state_updates = changed_availability_rows(stations, state, timestamp)
+    else:
+        availability_rows, state_updates = [availability_row(station, timestamp) for station in stations], {}
+
+    spool.append({"station": station_rows, "availability": availability_rows})
+
+    for row in station_rows:
+        fingerprints[row[0]] = row
+    state.update(state_updates)
+    return {
+        "stations_written": len(station_rows),
+        "stations_skipped": len(stations) - len(station_rows),
+        "availability_written": len(availability_rows),
+        "availability_skipped": len(stations) - len(availability_rows),
+    }
+
+# Forget what a dead-lettered row was recorded as: a station upsert that never reached the database must
+# not keep its fingerprint, or the station would never be upserted again, and a dropped change row must not
+# stay the baseline new observations are compared against.
+def forget_dead_letter(kind, row, fingerprints=None, state=None):
+    fingerprints = metadata_fingerprints if fingerprints is None else fingerprints
+    state = availability_state if state is None else state
+    if kind == "station" and fingerprints.get(row[0]) == tuple(row):
+        del fingerprints[row[0]]
+    elif kind == "availability":
+        state.pop(row[0], None)
+
+# Drain the spool to the database in bulk batches. Returns the rows flushed; rows stay spooled while it is down.
+def flush_spool(spool, target=None):
+    return spool.flush((target or storage).write, SPOOL_BATCH_ROWS, forget_dead_letter)
+
+# Fetch one snapshot, spool it and drain the spool, returning the stations (or None), the counts (or None)
+# and the fetch and write times in seconds
+def run_cycle():
+    started = time.perf_counter()
+    response = jcdecaux_client.get(dbinfo.STATIONS_URI, params={"apiKey": dbinfo.JCKEY, "contract": dbinfo.NAME})
+    fetched = time.perf_counter()
+
+    if response.status_code != 200:
+        print(f"API Error: {response.status_code}")
+        return None, None, fetched - started, 0.0
+
+    stations = json.loads(response.text)
+    spool = get_spool()
+    counts = store_snapshot(spool, stations)
+    counts["flushed"] = flush_spool(spool)
+    counts["pending"] = len(spool)
+    return stations, counts, fetched - started, time.perf_counter() - fetched
+
+# Running averages, opened by setup() when USAGE_CSV is set
+aggregator = None
+cycles = 0
+
+# Create the tables and open the running averages
+def setup():
+    global aggregator
     ensure_tables()
-
-    while True:
-        try:
-            
-            response = requests.get(dbinfo.STATIONS_URI, params={"apiKey": dbinfo.JCKEY, "contract": dbinfo.NAME})
-
-            if response.status_code == 200:
-                stations = json.loads(response.text)
-
-                for station in stations:
-                    store_station_metadata(station)  # Store station data
-                    store_availability(station)  # Store availability data
-
-            else:
-                print(f"API Error: {response.status_code}")
-
-            # Wait 5 minutes before fetching again
-            time.sleep(5 * 60)
-
-        except requests.exceptions.RequestException as e:
-            print(f"Request failed: {e}")
-        except Exception as e:
-            print(f"Unexpected error: {e}")
+    aggregator = open_aggregator(USAGE_STATE, USAGE_CSV, USAGE_HALF_LIFE_HOURS, USAGE_SEED_WEIGHT) if USAGE_CSV else None
+
+# One scheduled run: fetch, spool, flush and fold into the running averages. Raises when the fetch
+# failed, so the scheduler backs off; a database outage only leaves rows in the spool.
+def scrape_once():
+    global cycles
+    stations, counts, fetch_seconds, write_seconds = run_cycle()
+    if stations is None:
+        raise RuntimeError("No station data fetched")
+
+    print(f"Spooled {counts['availability_written']} availability rows and flushed {counts['flushed']} rows "
+          f"({counts['pending']} pending) in {fetch_seconds + write_seconds:.2f}s "
+          f"(fetch {fetch_seconds:.2f}s, write {write_seconds:.2f}s); skipped "
+          f"{counts['stations_skipped']} unchanged metadata upserts and "
+          f"{counts['availability_skipped']} unchanged availability rows.")
+
+    # Fold this snapshot into the running averages and persist them periodically
+    if aggregator is not None:
+        aggregator.update(stations, datetime.datetime.now())
+        cycles += 1
+        if cycles % USAGE_PERSIST_EVERY == 0:
+            aggregator.save_state(USAGE_STATE)
+            aggregator.save_csv(USAGE_CSV)
+
+# Persist the running averages, make a last attempt to drain the spool and close the connections on shutdown
+def teardown():
+    if aggregator is not None:
+        aggregator.save_state(USAGE_STATE)
+        aggregator.save_csv(USAGE_CSV)
+    if _spool is not None:
+        flush_spool(_spool)
+        _spool.close()
+    storage.close()
+
+# Scheduled job fetching and storing data every POLL_SECONDS (5 minutes by default), on the clock
+def scrape_job():
+    return Job("bike_scraper", scrape_once, POLL_SECONDS)
+
+# Run only the bike scraper; "scraper_daemon.py" runs it together with the weather scraper
+def main():
+    setup()
+    try:
+        run_jobs([scrape_job()])
+    finally:
+        teardown()
 
 # Run the script (CTRL + C) to stop it
 if __name__ == "__main__":
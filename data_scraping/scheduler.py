@@ -0,0 +1,140 @@
+import asyncio
+import datetime
+import math
+import random
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# One periodic job. run is a blocking function executed in a worker thread; it signals failure by raising.
+# Runs are due at every multiple of interval seconds on the wall clock (plus offset), so the cadence
+# does not drift with run time. After a failure the job is retried with exponential backoff starting at
+# retry_seconds, but never later than its next regular slot. At most max_concurrency runs overlap;
+# a slot that arrives while the limit is reached is skipped.
+class Job:
+    def __init__(self, name, run, interval, offset=0.0, retry_seconds=15.0, max_concurrency=1):
+        self.name = name
+        self.run = run
+        self.interval = interval
+        self.offset = offset
+        self.retry_seconds = retry_seconds
+        self.max_concurrency = max_concurrency
+        self.running = 0
+        self.failures = 0
+        self.runs = 0
+        self.errors = 0
+        self.skipped = 0
+        self.last_run_seconds = None
+
+    # Wall-clock time of the first regular slot strictly after now.
+    def next_slot(self, now):
+        return (math.floor((now - self.offset) / self.interval) + 1) * self.interval + self.offset
+
+    # When to try again after the current run of consecutive failures (full jitter, capped by the next slot).
+    def retry_at(self, now):
+        backoff = self.retry_seconds * (2 ** (self.failures - 1))
+        return min(self.next_slot(now), now + random.uniform(backoff / 2, backoff))
+
+
+# Runs jobs on their cadences in one asyncio loop until stop() is called or SIGINT/SIGTERM arrives,
+# then waits up to shutdown_timeout seconds for runs in progress to finish.
+class Scheduler:
+    def __init__(self, jobs, shutdown_timeout=60.0, run_immediately=True):
+        self.jobs = jobs
+        self.shutdown_timeout = shutdown_timeout
+        self.run_immediately = run_immediately
+        self._stop = None
+        self._tasks = set()
+        self._executor = ThreadPoolExecutor(max_workers=sum(job.max_concurrency for job in jobs),
+                                            thread_name_prefix="scraper")
+
+    async def _execute(self, job):
+        job.running += 1
+        started = time.perf_counter()
+        try:
+            await asyncio.get_running_loop().run_in_executor(self._executor, job.run)
+            job.failures = 0
+            return True
+        except Exception as e:
+            job.failures += 1
+            job.errors += 1
+            print(f"{job.name} failed ({job.failures} in a row): {e}")
+            return False
+        finally:
+            job.running -= 1
+            job.runs += 1
+            job.last_run_seconds = time.perf_counter() - started
+
+    async def _sleep_until(self, when):
+        try:
+            await asyncio.wait_for(self._stop.wait(), timeout=max(0.0, when - time.time()))
+        except asyncio.TimeoutError:
+            pass
+
+    async def _loop(self, job):
+        due = time.time() if self.run_immediately else job.next_slot(time.time())
+        while True:
+            await self._sleep_until(due)
+            if self._stop.is_set():
+                return
+
+            if job.running >= job.max_concurrency:
+                job.skipped += 1
+                print(f"{job.name} still running at {datetime.datetime.now():%H:%M:%S}, skipping this slot.")
+                due = job.next_slot(time.time())
+                continue
+
+            task = asyncio.ensure_future(self._execute(job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+            # Wait for the run, but no longer than the next slot (where the concurrency limit decides) or a stop.
+            next_slot = job.next_slot(time.time())
+            stopping = asyncio.ensure_future(self._stop.wait())
+            done, _ = await asyncio.wait({task, stopping}, timeout=max(0.0, next_slot - time.time()),
+                                         return_when=asyncio.FIRST_COMPLETED)
+            stopping.cancel()
+            if task in done and not task.result():
+                due = job.retry_at(time.time())
+            else:
+                due = job.next_slot(time.time()) if task in done else next_slot
+
+    # Ask every job loop to finish; runs in progress are allowed to complete.
+    def stop(self):
+        if self._stop is not None:
+            self._stop.set()
+
+    async def run(self):
+        self._stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, self.stop)
+            except (NotImplementedError, RuntimeError, ValueError):
+                pass
+
+        await asyncio.gather(*(self._loop(job) for job in self.jobs))
+
+        if self._tasks:
+            print(f"Waiting for {len(self._tasks)} running job(s) to finish.")
+            await asyncio.wait(set(self._tasks), timeout=self.shutdown_timeout)
+        self._executor.shutdown(wait=False)
+
+    def stats(self):
+        return {
+            job.name: {
+                "runs": job.runs,
+                "errors": job.errors,
+                "skipped": job.skipped,
+                "failures": job.failures,
+                "last_run_seconds": job.last_run_seconds,
+            }
+            for job in self.jobs
+        }
+
+
+# Run jobs until interrupted (CTRL + C or SIGTERM).
+def run_jobs(jobs, shutdown_timeout=60.0):
+    scheduler = Scheduler(jobs, shutdown_timeout=shutdown_timeout)
+    asyncio.run(scheduler.run())
+    return scheduler
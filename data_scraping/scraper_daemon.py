@@ -0,0 +1,36 @@
+import dbinfo
+import bike_scraper
+import weather_scraper
+from scheduler import Job, run_jobs
+from availability_archive import AvailabilityArchive, compact
+
+# Directory of the day-partitioned availability archive; set ARCHIVE_DIR in dbinfo to compact closed days nightly.
+ARCHIVE_DIR = getattr(dbinfo, "ARCHIVE_DIR", None)
+# Archived days this recent are re-archived when late rows (e.g. a spool flushed after an outage) reached them.
+ARCHIVE_RECHECK_DAYS = getattr(dbinfo, "ARCHIVE_RECHECK_DAYS", 7)
+
+# Roll closed days from the availability table into the archive
+def archive_once():
+    written = compact(bike_scraper.storage, AvailabilityArchive(ARCHIVE_DIR), recheck_days=ARCHIVE_RECHECK_DAYS)
+    print(f"Archived {sum(written.values())} availability rows over {len(written)} days.")
+
+# Run the bike and weather scrapers in one process, each on its own fixed wall-clock cadence.
+# CTRL + C or SIGTERM stops scheduling new runs, lets running ones finish, saves the usage averages and
+# drains both spools.
+def main():
+    bike_scraper.setup()
+    weather_scraper.ensure_tables()
+    jobs = [bike_scraper.scrape_job(), weather_scraper.scrape_job()]
+    if ARCHIVE_DIR:
+        jobs.append(Job("availability_archive", archive_once, 24 * 3600, offset=15 * 60))
+    try:
+        scheduler = run_jobs(jobs)
+        print(f"Scraper daemon stopped: {scheduler.stats()}")
+    finally:
+        try:
+            bike_scraper.teardown()
+        finally:
+            weather_scraper.teardown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import json
+import sqlite3
+import threading
+import time
+
+# Append-only local write-ahead spool for scraper rows, kept in SQLite (WAL mode) so a cycle's data is
+# durable on disk before the database is touched. Each entry is one row for one kind (e.g. "availability").
+# flush() drains the oldest entries in bulk batches and deletes them only after the writer committed
+# them, so an outage or crash never loses rows; writers must therefore be idempotent, since a crash
+# between their commit and the delete replays the batch.
+# A batch rejected for its data rather than the connection is retried row by row, so one bad row never
+# holds up the rows behind it; a row rejected max_attempts times is moved to the spool_dead_letter table.
+class Spool:
+    def __init__(self, path, max_attempts=3):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS spool (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                row TEXT NOT NULL,
+                spooled_at REAL NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        # Spool files written before rows counted their failed attempts.
+        if "attempts" not in [column[1] for column in self._conn.execute("PRAGMA table_info(spool)")]:
+            self._conn.execute("ALTER TABLE spool ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS spool_dead_letter (
+                id INTEGER PRIMARY KEY,
+                kind TEXT NOT NULL,
+                row TEXT NOT NULL,
+                spooled_at REAL NOT NULL,
+                failed_at REAL NOT NULL,
+                error TEXT NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    # Append rows for several kinds in one local transaction: {"station": [...], "availability": [...]}.
+    def append(self, rows_by_kind):
+        now = time.time()
+        entries = [
+            (kind, json.dumps(list(row), separators=(",", ":")), now)
+            for kind, rows in rows_by_kind.items() for row in rows
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT INTO spool (kind, row, spooled_at) VALUES (?, ?, ?)", entries)
+        return len(entries)
+
+    # Oldest entries after after_id as (last id, {kind: [row tuples]}), or (None, {}) when there are none.
+    def peek(self, limit, after_id=0):
+        with self._lock:
+            entries = self._conn.execute(
+                "SELECT id, kind, row FROM spool WHERE id > ? ORDER BY id LIMIT ?", (after_id, limit)
+            ).fetchall()
+        rows_by_kind = {}
+        for _, kind, row in entries:
+            rows_by_kind.setdefault(kind, []).append(tuple(json.loads(row)))
+        return (entries[-1][0] if entries else None), rows_by_kind
+
+    # Remove every entry after after_id up to and including last_id.
+    def ack(self, last_id, after_id=0):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM spool WHERE id > ? AND id <= ?", (after_id, last_id))
+
+    # Drain the spool through write({kind: rows}), batch_size rows at a time, oldest first. A batch that
+    # fails on the connection stops the flush and stays spooled for the next one; a batch rejected for its
+    # data is written row by row instead, each rejected row getting one attempt per flush. on_dead_letter,
+    # when given, is called with (kind, row tuple) for every row moved to the dead letter table, so callers
+    # can forget whatever they derived from having spooled it. Returns the rows flushed.
+    def flush(self, write, batch_size=5000, on_dead_letter=None):
+        flushed = 0
+        position = 0
+        while True:
+            last_id, rows_by_kind = self.peek(batch_size, position)
+            if last_id is None:
+                return flushed
+            try:
+                write(rows_by_kind)
+            except Exception as e:
+                if not is_data_error(e):
+                    print(f"Spool flush failed, {len(self)} rows kept for the next attempt: {e}")
+                    return flushed
+                written, stopped = self._flush_rows(write, position, last_id, on_dead_letter)
+                flushed += written
+                if stopped:
+                    return flushed
+            else:
+                self.ack(last_id, position)
+                flushed += sum(len(rows) for rows in rows_by_kind.values())
+            position = last_id
+
+    # Write the entries in (after_id, last_id] one at a time. Rows rejected for their data count an attempt and go
+    # to the dead letter table on the last one. Returns (rows written, whether a connection error stopped it).
+    def _flush_rows(self, write, after_id, last_id, on_dead_letter=None):
+        with self._lock:
+            entries = self._conn.execute(
+                "SELECT id, kind, row, attempts FROM spool WHERE id > ? AND id <= ? ORDER BY id", (after_id, last_id)
+            ).fetchall()
+        written = 0
+        for entry_id, kind, row, attempts in entries:
+            try:
+                write({kind: [tuple(json.loads(row))]})
+            except Exception as e:
+                if not is_data_error(e):
+                    print(f"Spool flush failed, {len(self)} rows kept for the next attempt: {e}")
+                    return written, True
+                if self._reject(entry_id, attempts + 1, e) and on_dead_letter is not None:
+                    on_dead_letter(kind, tuple(json.loads(row)))
+                continue
+            with self._lock, self._conn:
+                self._conn.execute("DELETE FROM spool WHERE id = ?", (entry_id,))
+            written += 1
+        return written, False
+
+    # Count a failed attempt for an entry, moving it to the dead letter table on the last one.
+    # Returns whether it was moved.
+    def _reject(self, entry_id, attempts, error):
+        with self._lock, self._conn:
+            if attempts < self.max_attempts:
+                self._conn.execute("UPDATE spool SET attempts = ? WHERE id = ?", (attempts, entry_id))
+                return False
+            self._conn.execute(
+                "INSERT INTO spool_dead_letter (id, kind, row, spooled_at, failed_at, error) "
+                "SELECT id, kind, row, spooled_at, ?, ? FROM spool WHERE id = ?",
+                (time.time(), str(error), entry_id)
+            )
+            self._conn.execute("DELETE FROM spool WHERE id = ?", (entry_id,))
+        print(f"Spool row {entry_id} rejected {attempts} times, moved to spool_dead_letter: {error}")
+        return True
+
+    # Rows moved to the dead letter table as (kind, row tuple, error), oldest first.
+    def dead_letters(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT kind, row, error FROM spool_dead_letter ORDER BY id").fetchall()
+        return [(kind, tuple(json.loads(row)), error) for kind, row, error in entries]
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM spool").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# Whether a write failed because of the rows themselves (a constraint or a value the column rejects)
+# rather than the connection. DB-API drivers (sqlite3, mysql.connector) name these errors alike.
+def is_data_error(error):
+    return any(cls.__name__ in ("IntegrityError", "DataError") for cls in type(error).__mro__)
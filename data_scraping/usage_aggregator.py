@@ -0,0 +1,108 @@
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+
+# Observations a seeded average counts as per cell: four weeks of 5-minute samples (12 per weekday hour
+# each week), so live samples refine the historical average instead of replacing it within a few cycles.
+DEFAULT_SEED_WEIGHT = 4 * 12
+
+# Keeps running sums and counts of available docks per (station, weekday, hour) as availability rows arrive,
+# so "static/station_avg_usage.csv" can be rewritten without recomputing from the whole history.
+# With half_life_hours set, older observations are exponentially down-weighted per cell.
+class UsageAggregator:
+    def __init__(self, n_stations=0, half_life_hours=None):
+        self.half_life_hours = half_life_hours
+        self.sums = np.zeros((n_stations, 7, 24), dtype=np.float64)
+        self.counts = np.zeros((n_stations, 7, 24), dtype=np.float64)
+        self.last_seen = np.zeros((n_stations, 7, 24), dtype=np.float64)
+
+    # Make room for station ids beyond the current array size.
+    def _ensure_station(self, station_id):
+        if station_id < self.sums.shape[0]:
+            return
+        extra = station_id + 1 - self.sums.shape[0]
+        padding = np.zeros((extra, 7, 24), dtype=np.float64)
+        self.sums = np.concatenate([self.sums, padding])
+        self.counts = np.concatenate([self.counts, padding])
+        self.last_seen = np.concatenate([self.last_seen, padding])
+
+    # Add one observation of available docks for a station at a datetime.
+    def add(self, station_id, available_docks, date_time):
+        self._ensure_station(station_id)
+        cell = (station_id, date_time.weekday(), date_time.hour)
+        timestamp = date_time.timestamp()
+
+        if self.half_life_hours and self.last_seen[cell] > 0:
+            elapsed_hours = max(0.0, timestamp - self.last_seen[cell]) / 3600
+            decay = 0.5 ** (elapsed_hours / self.half_life_hours)
+            self.sums[cell] *= decay
+            self.counts[cell] *= decay
+
+        self.sums[cell] += available_docks
+        self.counts[cell] += 1
+        self.last_seen[cell] = max(self.last_seen[cell], timestamp)
+
+    # Add every station of one JCDecaux snapshot (as stored in the availability table).
+    def update(self, stations, date_time):
+        for station in stations:
+            self.add(int(station["number"]), station["available_bike_stands"], date_time)
+
+    # Averages in the same layout as "station_avg_usage.csv".
+    def to_frame(self):
+        station_ids, day_names, hours = np.nonzero(self.counts)
+        averages = self.sums[station_ids, day_names, hours] / self.counts[station_ids, day_names, hours]
+        return pd.DataFrame({
+            "station_id": station_ids,
+            "day_name": day_names,
+            "hour": hours,
+            "avg_docks": np.round(averages, 2),
+        })
+
+    # Write the averages CSV atomically, so the app never reads a half-written file.
+    def save_csv(self, path):
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=".csv")
+        os.close(fd)
+        self.to_frame().to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+    # Persist the running sums and counts so a restarted scraper carries on where it stopped.
+    def save_state(self, path):
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=".npz")
+        os.close(fd)
+        np.savez(tmp_path, sums=self.sums, counts=self.counts, last_seen=self.last_seen)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load_state(cls, path, half_life_hours=None):
+        with np.load(path) as data:
+            aggregator = cls(0, half_life_hours)
+            aggregator.sums = data["sums"]
+            aggregator.counts = data["counts"]
+            aggregator.last_seen = data["last_seen"]
+        return aggregator
+
+    # Start from an existing averages CSV, counting each cell as `weight` observations.
+    @classmethod
+    def from_csv(cls, path, weight=DEFAULT_SEED_WEIGHT, half_life_hours=None):
+        df = pd.read_csv(path)
+        aggregator = cls(int(df["station_id"].max()) + 1 if len(df) else 0, half_life_hours)
+        cells = (
+            df["station_id"].to_numpy(dtype=np.int64),
+            df["day_name"].to_numpy(dtype=np.int64),
+            df["hour"].to_numpy(dtype=np.int64),
+        )
+        aggregator.sums[cells] = df["avg_docks"].to_numpy(dtype=np.float64) * weight
+        aggregator.counts[cells] = weight
+        return aggregator
+
+
+# Resume from saved state, else seed from the existing CSV, else start empty.
+def open_aggregator(state_path, csv_path=None, half_life_hours=None, seed_weight=DEFAULT_SEED_WEIGHT):
+    if state_path and os.path.exists(state_path):
+        return UsageAggregator.load_state(state_path, half_life_hours)
+    if csv_path and os.path.exists(csv_path):
+        return UsageAggregator.from_csv(csv_path, seed_weight, half_life_hours)
+    return UsageAggregator(half_life_hours=half_life_hours)
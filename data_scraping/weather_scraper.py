@@ -1,79 +1,66 @@
 import requests
-import json
 import datetime
-import time
-import mysql.connector
+import os
+import sys
 import dbinfo_weather           # dbinfo_weather contains important and sensitive information such as host, database, user, password, and API key.
 
-# Connect to MySQL database
-def get_db_connection():
-    try:
-        conn = mysql.connector.connect(
-            host=dbinfo_weather.DB_HOST,
-            database=dbinfo_weather.DB_NAME,
-            user=dbinfo_weather.DB_USER,
-            password=dbinfo_weather.DB_PASSWORD
-        )
-        return conn
-    except Exception as e:
-        print("Database connection error: {}".format(e))
-        return None
+# Shared modules live in the repository root.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from upstream_client import get_client
+from storage import storage_from_config
+from scheduler import Job, run_jobs
+from spool import Spool
+
+# Pooled client with timeouts, retries and a circuit breaker.
+openweathermap_client = get_client("openweathermap")
+
+# Seconds between fetches.
+POLL_SECONDS = getattr(dbinfo_weather, "POLL_SECONDS", 3600)
+
+# Local write-ahead spool every reading is written to before the database.
+SPOOL_PATH = getattr(dbinfo_weather, "SPOOL_PATH", "weather_spool.sqlite3")
+SPOOL_MAX_ATTEMPTS = getattr(dbinfo_weather, "SPOOL_MAX_ATTEMPTS", 3)
+
+# Database the readings are written to: STORAGE_URL in dbinfo_weather, otherwise MySQL with the DB_* settings
+storage = storage_from_config(dbinfo_weather)
 
 # Ensures required tables exist
 def ensure_tables():
-    conn = get_db_connection()
-    if conn:
-        cur = conn.cursor()
-
-        # Create the table for weather data if it doesn't already exist
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS weather_data (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                city VARCHAR(100),
-                temperature FLOAT,
-                feels_like FLOAT,
-                humidity INT,
-                wind_speed FLOAT,
-                description VARCHAR(255),
-                last_update TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-        """)
-
-        conn.commit()
-        cur.close()
-        conn.close()
+    try:
+        storage.ensure_tables(["weather_data"])
         print("Weather table checked/created successfully.")
+    except Exception as e:
+        print("Database error while checking tables: {}".format(e))
+
+# Spool opened on first use
+_spool = None
 
-# Store weather data in the database
+def get_spool():
+    global _spool
+    if _spool is None:
+        _spool = Spool(SPOOL_PATH, SPOOL_MAX_ATTEMPTS)
+    return _spool
+
+# Drain the spool to the database. Readings stay spooled while it is unavailable.
+def flush_spool(spool):
+    return spool.flush(storage.write)
+
+# Store weather data: spool it locally first (stamped with the time it was read), then drain the spool
 def store_weather_data(data):
-    conn = get_db_connection()
-    if not conn:
-        return
+    current_timestamp = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    spool = get_spool()
+    spool.append({"weather_data": [(
+        data["city"],
+        data["temperature"],
+        data["feels_like"],
+        data["humidity"],
+        data["wind_speed"],
+        data["description"],
+        current_timestamp
+    )]})
 
-    try:
-        cur = conn.cursor()
-
-        # Insert new weather data
-        cur.execute("""
-            INSERT INTO weather_data (city, temperature, feels_like, humidity, wind_speed, description)
-            VALUES (%s, %s, %s, %s, %s, %s);
-        """, (
-            data["city"],
-            data["temperature"],
-            data["feels_like"],
-            data["humidity"],
-            data["wind_speed"],
-            data["description"]
-        ))
-
-        conn.commit()
-        cur.close()
-        conn.close()
-        
-        current_timestamp = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        print(f"Weather data for {data['city']} stored at {current_timestamp}.")
-    except Exception as e:
-        print(f"Error storing weather data: {e}")
+    flushed = flush_spool(spool)
+    print(f"Weather data for {data['city']} spooled at {current_timestamp}, {flushed} readings stored.")
 
 # Fetch weather data from OpenWeatherMap API
 def get_weather():
@@ -84,7 +71,7 @@ def get_weather():
             "appid": dbinfo_weather.API_KEY,
             "units": "metric"
         }
-        response = requests.get(dbinfo_weather.WEATHER_API_URL, params=params)
+        response = openweathermap_client.get(dbinfo_weather.WEATHER_API_URL, params=params)
 
         if response.status_code == 200:
             data = response.json()
@@ -103,24 +90,35 @@ def get_weather():
         print("Request failed: {}".format(e))
         return None
 
-# Main loop to fetch and store weather data every hour
-def main():
-    ensure_tables()
+# One scheduled run: fetch and store the current weather. Raises when nothing was fetched, so the scheduler backs off.
+def scrape_once():
+    print("Fetching weather data at {}.".format(datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+
+    weather_data = get_weather()
+    if not weather_data:
+        raise RuntimeError("No weather data fetched")
+    store_weather_data(weather_data)
 
-    while True:
-        try:
-            print("Fetching weather data at {}.".format(datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+# Scheduled job fetching and storing weather data every POLL_SECONDS (1 hour by default), on the clock
+def scrape_job():
+    return Job("weather_scraper", scrape_once, POLL_SECONDS)
 
-            weather_data = get_weather()
-            if weather_data:
-                store_weather_data(weather_data)
+# Make a last attempt to drain the spool and close the spool and the database connection on shutdown
+def teardown():
+    global _spool
+    if _spool is not None:
+        flush_spool(_spool)
+        _spool.close()
+        _spool = None
+    storage.close()
 
-            # Wait 1 hour before fetching again
-            time.sleep(3600)
-        except requests.exceptions.RequestException as e:
-            print("Request failed: {}".format(e))
-        except Exception as e:
-            print("Unexpected error: {}".format(e))
+# Run only the weather scraper; "scraper_daemon.py" runs it together with the bike scraper
+def main():
+    ensure_tables()
+    try:
+        run_jobs([scrape_job()])
+    finally:
+        teardown()
 
 # Run the script (CTRL + C) to stop it
 if __name__ == "__main__":
@@ -0,0 +1,129 @@
+import threading
+import time
+from datetime import datetime, timedelta
+import numpy as np
+
+# Value stored for cells that could not be predicted (e.g. a station without a model).
+MISSING = -1
+
+# Precomputed predictions for every station for each hour of the next `hours` hours.
+# compute(items, now) takes (station_id, datetime) pairs and returns result dicts in the
+# shape of predict_bike_availability_batch. live_horizon is the cut-off (in seconds) below which
+# a prediction uses live dock data, so lookups can tell whether a cell still matches live inference.
+class ForecastGrid:
+    def __init__(self, compute, station_ids, hours=48, live_horizon=6 * 3600, refresh_seconds=900,
+                 check_seconds=60, source_version=None):
+        self.compute = compute
+        self.station_ids = station_ids
+        self.hours = hours
+        self.live_horizon = live_horizon
+        self.refresh_seconds = refresh_seconds
+        self.check_seconds = check_seconds
+        self.source_version = source_version or (lambda: None)
+        self._grid = None
+        self._built_key = None
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.last_refresh_seconds = None
+
+    # Key of the data a grid is built from: the upstream source version, the refresh interval and the hour.
+    # The grid is rebuilt when any of them changes, so refresh_seconds is the maximum age of a grid.
+    def _build_key(self, base):
+        return (self.source_version(), int(time.time() // self.refresh_seconds), base)
+
+    # Recompute the whole grid from the current upstream data.
+    def refresh(self, now=None):
+        with self._refresh_lock:
+            now = now or datetime.now()
+            start = time.perf_counter()
+
+            base = now.replace(minute=0, second=0, microsecond=0)
+            slot_times = [base + timedelta(hours=hour) for hour in range(self.hours)]
+            station_ids = list(self.station_ids())
+            station_index = {station_id: row for row, station_id in enumerate(station_ids)}
+
+            # Keyed before computing, so a source that changes mid-build leaves the grid stale, not mislabelled.
+            key = self._build_key(base)
+            items = [(station_id, slot) for station_id in station_ids for slot in slot_times]
+            results = self.compute(items, now)
+
+            values = np.full((len(station_ids), self.hours), MISSING, dtype=np.int32)
+            for (station_id, slot), result in zip(items, results):
+                if "predicted_available_bikes" in result:
+                    hour = int((slot - base).total_seconds() // 3600)
+                    values[station_index[station_id], hour] = result["predicted_available_bikes"]
+
+            # Whether each hour column was computed from live dock data.
+            live = np.array([(slot - now).total_seconds() < self.live_horizon for slot in slot_times])
+
+            self._grid = (base, station_index, values, live)
+            self._built_key = key
+            self.refreshes += 1
+            self.last_refresh_seconds = time.perf_counter() - start
+
+    # Refresh if the upstream data, the refresh interval or the current hour changed since the last build.
+    def refresh_if_stale(self):
+        now = datetime.now()
+        base = now.replace(minute=0, second=0, microsecond=0)
+        if self._built_key != self._build_key(base):
+            self.refresh(now)
+
+    # Return the precomputed prediction, or None when the caller should fall back to live inference.
+    def lookup(self, station_id, date_time, now=None):
+        grid = self._grid
+        if grid is None:
+            self.misses += 1
+            return None
+        base, station_index, values, live = grid
+
+        hour = int((date_time.replace(minute=0, second=0, microsecond=0) - base).total_seconds() // 3600)
+        row = station_index.get(station_id)
+        if row is None or hour < 0 or hour >= self.hours:
+            self.misses += 1
+            return None
+
+        # A cell is only valid if live inference would use the same dock source right now.
+        now = now or datetime.now()
+        wants_live = (date_time - now).total_seconds() < self.live_horizon
+        value = values[row, hour]
+        if value == MISSING or bool(live[hour]) != wants_live:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return int(value)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh_if_stale()
+            except Exception as e:
+                print(f"Forecast grid refresh failed: {e}")
+            self._stop.wait(self.check_seconds)
+
+    # Start the background refresh thread.
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="forecast-grid", daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        grid = self._grid
+        return {
+            "built_for": grid[0].strftime("%Y-%m-%d %H:%M") if grid else None,
+            "stations": len(grid[1]) if grid else 0,
+            "hours": self.hours,
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "last_refresh_seconds": self.last_refresh_seconds,
+        }
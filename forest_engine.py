@@ -0,0 +1,243 @@
+import argparse
+import os
+import pickle
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+# Bumped whenever the array layout below changes.
+FORMAT_VERSION = 1
+
+# Marker used by scikit-learn for "no child" in tree_.children_left/right.
+TREE_LEAF = -1
+
+# A RandomForestRegressor flattened into contiguous arrays.
+# All trees share one node table; "roots" holds the index of each tree's first node.
+# Leaves point at themselves, which is how they are recognised at prediction time; is_leaf caches that
+# per node and is derived from left unless given (the model store keeps it in the file so it is shared too).
+class CompiledForest:
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth, feature_names=None, is_leaf=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.feature_names = list(feature_names) if feature_names is not None else None
+        self.is_leaf = is_leaf if is_leaf is not None else left == np.arange(left.shape[0])
+
+    # Flatten a fitted scikit-learn forest.
+    @classmethod
+    def from_sklearn(cls, model):
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            node_ids = np.arange(tree.node_count)
+            is_leaf = tree.children_left == TREE_LEAF
+
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+            thresholds.append(tree.threshold.astype(np.float64))
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left).astype(np.int32) + offset)
+            rights.append(np.where(is_leaf, node_ids, tree.children_right).astype(np.int32) + offset)
+            values.append(tree.value[:, 0, 0].astype(np.float64))
+            roots.append(offset)
+
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+
+        feature_names = getattr(model, "feature_names_in_", None)
+        return cls(
+            np.concatenate(features),
+            np.concatenate(thresholds),
+            np.concatenate(lefts),
+            np.concatenate(rights),
+            np.concatenate(values),
+            np.asarray(roots, dtype=np.int32),
+            max_depth,
+            feature_names,
+        )
+
+    # Arrays that fully describe the forest, used for saving and for the shared model store.
+    def to_arrays(self):
+        arrays = {
+            "format_version": np.asarray([FORMAT_VERSION], dtype=np.int32),
+            "max_depth": np.asarray([self.max_depth], dtype=np.int32),
+            "feature": self.feature,
+            "threshold": self.threshold,
+            "left": self.left,
+            "right": self.right,
+            "value": self.value,
+            "roots": self.roots,
+        }
+        if self.feature_names is not None:
+            arrays["feature_names"] = np.asarray(self.feature_names, dtype="U")
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        version = int(arrays["format_version"][0])
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported compiled forest version {version}")
+        feature_names = arrays["feature_names"] if "feature_names" in arrays else None
+        return cls(
+            arrays["feature"],
+            arrays["threshold"],
+            arrays["left"],
+            arrays["right"],
+            arrays["value"],
+            arrays["roots"],
+            arrays["max_depth"][0],
+            feature_names,
+        )
+
+    def save(self, path):
+        np.savez(path, **self.to_arrays())
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls.from_arrays({name: data[name] for name in data.files})
+
+    # Convert model input to the float32 matrix scikit-learn trees compare against.
+    def _as_matrix(self, X):
+        if isinstance(X, pd.DataFrame) and self.feature_names is not None:
+            X = X[self.feature_names]
+        return np.asarray(X, dtype=np.float32).astype(np.float64)
+
+    # Predict with a vectorised walk over every (row, tree) pair at once.
+    # Pairs that reach a leaf drop out of the active set, so shallow branches stop early.
+    # Matches RandomForestRegressor.predict: float32 inputs, "<=" splits, per-tree sums in tree order.
+    def predict(self, X):
+        X = self._as_matrix(X)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        n_rows, n_features = X.shape
+        n_trees = self.roots.shape[0]
+
+        flat_X = X.ravel()
+        row_offsets = np.repeat(np.arange(n_rows, dtype=np.int64) * n_features, n_trees)
+        nodes = np.tile(self.roots.astype(np.int64), n_rows)
+        active = np.flatnonzero(~self.is_leaf[nodes])
+        while active.size:
+            current = nodes[active]
+            go_left = flat_X[row_offsets[active] + self.feature[current]] <= self.threshold[current]
+            following = np.where(go_left, self.left[current], self.right[current])
+            nodes[active] = following
+            active = active[~self.is_leaf[following]]
+
+        leaf_values = self.value[nodes].reshape(n_rows, n_trees)
+        prediction = np.zeros(n_rows, dtype=np.float64)
+        for tree in range(n_trees):
+            prediction += leaf_values[:, tree]
+        prediction /= n_trees
+        return prediction
+
+
+# Compile every pickled station model in src_dir into .npz files in dest_dir.
+def compile_directory(src_dir, dest_dir):
+    os.makedirs(dest_dir, exist_ok=True)
+    compiled = []
+    for filename in sorted(os.listdir(src_dir)):
+        if not (filename.startswith("station_") and filename.endswith(".pkl")):
+            continue
+        with open(os.path.join(src_dir, filename), "rb") as file:
+            model = pickle.load(file)
+        forest = CompiledForest.from_sklearn(model)
+        dest_path = os.path.join(dest_dir, filename[:-len(".pkl")] + ".npz")
+        tmp_path = dest_path + ".tmp.npz"
+        forest.save(tmp_path)
+        os.replace(tmp_path, dest_path)
+        compiled.append(dest_path)
+        print(f"Compiled {filename} -> {dest_path}")
+    return compiled
+
+
+# Time a callable, returning the median seconds per call.
+def time_call(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+# Compare the current pickle + sklearn prediction path against the compiled engine for one station.
+def benchmark(station_id, model_dir="station_models", repeat=20, batch_size=1000):
+    pickle_path = os.path.join(model_dir, f"station_{station_id}.pkl")
+    with open(pickle_path, "rb") as file:
+        model = pickle.load(file)
+    forest = CompiledForest.from_sklearn(model)
+
+    tmp_dir = tempfile.TemporaryDirectory()
+    compiled_path = os.path.join(tmp_dir.name, f"station_{station_id}.npz")
+    forest.save(compiled_path)
+
+    # A single request in the shape predict_bike_availability builds, and a random batch.
+    row = pd.DataFrame([{
+        'num_docks_available': 10, 'day': 14, 'hour': 12,
+        'avg_air_temp': 12.5, 'avg_humidity': 80, 'day_name': 0
+    }])
+    rng = np.random.default_rng(0)
+    batch = pd.DataFrame({
+        'num_docks_available': rng.integers(0, 40, batch_size),
+        'day': rng.integers(1, 29, batch_size),
+        'hour': rng.integers(0, 24, batch_size),
+        'avg_air_temp': rng.uniform(-2, 25, batch_size),
+        'avg_humidity': rng.uniform(40, 100, batch_size),
+        'day_name': rng.integers(0, 7, batch_size),
+    })
+
+    def load_pickle():
+        with open(pickle_path, "rb") as file:
+            return pickle.load(file)
+
+    try:
+        results = {
+            "station_id": station_id,
+            "identical_predictions": bool(np.array_equal(model.predict(batch), forest.predict(batch))),
+            "pickle_load_and_predict_s": time_call(lambda: load_pickle().predict(row), max(1, repeat // 10)),
+            "compiled_load_and_predict_s": time_call(lambda: CompiledForest.load(compiled_path).predict(row), repeat),
+            "sklearn_predict_row_s": time_call(lambda: model.predict(row), repeat),
+            "compiled_predict_row_s": time_call(lambda: forest.predict(row), repeat),
+            "sklearn_predict_batch_s": time_call(lambda: model.predict(batch), repeat),
+            "compiled_predict_batch_s": time_call(lambda: forest.predict(batch), repeat),
+        }
+    finally:
+        tmp_dir.cleanup()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile station RandomForest pickles into array-backed models.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    compile_parser = subparsers.add_parser("compile", help="Compile every station model")
+    compile_parser.add_argument("--src", default="station_models")
+    compile_parser.add_argument("--dest", default="compiled_models")
+
+    bench_parser = subparsers.add_parser("bench", help="Benchmark compiled vs pickled prediction")
+    bench_parser.add_argument("--station", type=int, action="append", default=None)
+    bench_parser.add_argument("--src", default="station_models")
+    bench_parser.add_argument("--repeat", type=int, default=20)
+    bench_parser.add_argument("--batch-size", type=int, default=1000)
+
+    args = parser.parse_args()
+    if args.command == "compile":
+        compile_directory(args.src, args.dest)
+    else:
+        for station_id in args.station or [1]:
+            results = benchmark(station_id, args.src, args.repeat, args.batch_size)
+            for name, value in results.items():
+                if isinstance(value, float):
+                    print(f"{name:30s} {value * 1000:10.3f} ms")
+                else:
+                    print(f"{name:30s} {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+# Measures how much accuracy is lost by shrinking the station forests, and emits the chosen compact models.
+# Example, from the directory where "app.py" is located:
+#   python machine_learning/compact_models.py report --data cleaned_historical_weather_data.csv --sample 10
+#   python machine_learning/compact_models.py emit --data cleaned_historical_weather_data.csv \
+#       --setting n_estimators=30,max_depth=12,min_samples_leaf=2 --out compact_models
+import argparse
+import csv
+import itertools
+import os
+import pickle
+import sys
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_absolute_error
+from sklearn.model_selection import train_test_split
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from forest_engine import CompiledForest, time_call
+from machine_learning.train_models import FEATURES, TARGET, partition_by_station, train_all
+
+# Default search grid. None for max_depth means unbounded, which is what the current models use.
+DEFAULT_GRID = {
+    "n_estimators": [100, 50, 25, 10],
+    "max_depth": [None, 16, 12, 8],
+    "min_samples_leaf": [1, 2, 5],
+}
+
+REPORT_COLUMNS = [
+    "n_estimators", "max_depth", "min_samples_leaf", "stations", "mae", "mae_change",
+    "model_kb", "load_ms", "predict_row_ms", "predict_batch_ms", "compiled_row_ms",
+]
+
+
+# Parse "n_estimators=30,max_depth=12,min_samples_leaf=2" into RandomForestRegressor params.
+# Settings left out keep the current model defaults.
+def parse_setting(text):
+    params = {"n_estimators": 100, "max_depth": None, "min_samples_leaf": 1}
+    for part in text.split(","):
+        name, value = part.split("=")
+        name = name.strip()
+        if name not in DEFAULT_GRID:
+            raise ValueError(f"Unknown setting {name}")
+        params[name] = None if value.strip().lower() == "none" else int(value)
+    return params
+
+
+# Every combination of the grid as a list of params dicts.
+def expand_grid(grid):
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+# Train one setting on one station's train split and measure accuracy, size and latency.
+def evaluate_setting(station_data, params, seed=42, test_size=0.2, repeat=5):
+    X = station_data[FEATURES]
+    y = station_data[TARGET]
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=seed)
+
+    model = RandomForestRegressor(random_state=seed, n_jobs=1, **params)
+    model.fit(X_train, y_train)
+    data = pickle.dumps(model)
+    compiled = CompiledForest.from_sklearn(model)
+    row = X_test.iloc[:1]
+
+    return {
+        "mae": float(mean_absolute_error(y_test, model.predict(X_test))),
+        "model_kb": len(data) / 1024,
+        "load_ms": time_call(lambda: pickle.loads(data), repeat) * 1000,
+        "predict_row_ms": time_call(lambda: model.predict(row), repeat) * 1000,
+        "predict_batch_ms": time_call(lambda: model.predict(X_test), repeat) * 1000,
+        "compiled_row_ms": time_call(lambda: compiled.predict(row), repeat) * 1000,
+    }
+
+
+# Evaluate every setting across the given stations and average the measurements per setting.
+def build_report(partitions, settings, seed=42, test_size=0.2, repeat=5):
+    report = []
+    for params in settings:
+        measurements = [
+            evaluate_setting(station_data, params, seed, test_size, repeat)
+            for station_data in partitions.values()
+        ]
+        summary = dict(params)
+        summary["stations"] = len(measurements)
+        for name in ["mae", "model_kb", "load_ms", "predict_row_ms", "predict_batch_ms", "compiled_row_ms"]:
+            summary[name] = float(np.mean([m[name] for m in measurements]))
+        report.append(summary)
+        print(format_row(summary))
+
+    # MAE change is relative to the largest model in the grid (the closest to the current defaults).
+    baseline = max(report, key=lambda r: (r["n_estimators"], r["max_depth"] or 10 ** 9, -r["min_samples_leaf"]))
+    for summary in report:
+        summary["mae_change"] = summary["mae"] - baseline["mae"]
+    return report
+
+
+def format_row(summary):
+    return (
+        f"trees={summary['n_estimators']:>4} depth={str(summary['max_depth']):>4} "
+        f"leaf={summary['min_samples_leaf']:>2}  mae={summary['mae']:.3f}  size={summary['model_kb']:.0f}KB  "
+        f"load={summary['load_ms']:.2f}ms  row={summary['predict_row_ms']:.2f}ms  "
+        f"batch={summary['predict_batch_ms']:.2f}ms  compiled_row={summary['compiled_row_ms']:.2f}ms"
+    )
+
+
+def write_report(report, path):
+    with open(path, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=REPORT_COLUMNS)
+        writer.writeheader()
+        for summary in report:
+            writer.writerow({name: summary.get(name) for name in REPORT_COLUMNS})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark and emit compact station models.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    report_parser = subparsers.add_parser("report", help="Accuracy vs size/latency report over a grid of settings")
+    report_parser.add_argument("--data", default="cleaned_historical_weather_data.csv")
+    report_parser.add_argument("--stations", type=int, nargs="*", help="Station ids to evaluate")
+    report_parser.add_argument("--sample", type=int, default=10, help="Evaluate this many stations when --stations is not given")
+    report_parser.add_argument("--setting", action="append", help="Evaluate only these settings instead of the default grid")
+    report_parser.add_argument("--repeat", type=int, default=5)
+    report_parser.add_argument("--seed", type=int, default=42)
+    report_parser.add_argument("--csv", help="Also write the report to this CSV file")
+
+    emit_parser = subparsers.add_parser("emit", help="Train every station with one setting as a drop-in station_models/")
+    emit_parser.add_argument("--data", default="cleaned_historical_weather_data.csv")
+    emit_parser.add_argument("--setting", required=True)
+    emit_parser.add_argument("--out", default="compact_models")
+    emit_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    emit_parser.add_argument("--seed", type=int, default=42)
+
+    args = parser.parse_args()
+    partitions = partition_by_station(args.data)
+
+    if args.command == "report":
+        if args.stations:
+            station_ids = [station_id for station_id in args.stations if station_id in partitions]
+        else:
+            station_ids = sorted(partitions)[:args.sample]
+        settings = [parse_setting(text) for text in args.setting] if args.setting else expand_grid(DEFAULT_GRID)
+        report = build_report({sid: partitions[sid] for sid in station_ids}, settings, args.seed, repeat=args.repeat)
+        if args.csv:
+            write_report(report, args.csv)
+            print(f"Report written to {args.csv}")
+    else:
+        params = parse_setting(args.setting)
+        params["n_jobs"] = 1
+        manifest = train_all(partitions, args.out, params, args.workers, seed=args.seed)
+        print(f"Wrote {len(manifest['stations'])} compact models to {args.out}; "
+              f"point the app at them by replacing station_models/ with this directory.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# Command-line version of the per-station training loop in "ml_training.ipynb".
+# Example, from the directory where "app.py" is located:
+#   python machine_learning/train_models.py --data cleaned_historical_weather_data.csv --workers 4
+import argparse
+import json
+import os
+import pickle
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_absolute_error
+from sklearn.model_selection import train_test_split
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Features in the order the app builds its input rows, and the target column.
+FEATURES = ["num_docks_available", "day", "hour", "avg_air_temp", "avg_humidity", "day_name"]
+TARGET = "num_bikes_available"
+
+MANIFEST_NAME = "manifest.json"
+
+
+# Write bytes to path via a temporary file in the same directory, so readers never see a partial file.
+def atomic_write(path, data):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+# Load the cleaned CSV and split it into one DataFrame per station with a single groupby.
+def partition_by_station(data_path):
+    data = pd.read_csv(data_path, usecols=["station_id", TARGET] + FEATURES)
+    return {int(station_id): group[FEATURES + [TARGET]] for station_id, group in data.groupby("station_id")}
+
+
+# Train, evaluate and save the model for one station. Runs inside a worker process.
+def train_station(station_id, station_data, out_dir, params, test_size, seed, refit):
+    start = time.perf_counter()
+    X = station_data[FEATURES]
+    y = station_data[TARGET]
+
+    metrics = {"rows": int(len(station_data))}
+    if test_size and len(station_data) >= 10:
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=seed)
+        model = RandomForestRegressor(random_state=seed, **params)
+        model.fit(X_train, y_train)
+        metrics["mae"] = float(mean_absolute_error(y_test, model.predict(X_test)))
+        if refit:
+            model = RandomForestRegressor(random_state=seed, **params)
+            model.fit(X, y)
+    else:
+        model = RandomForestRegressor(random_state=seed, **params)
+        model.fit(X, y)
+
+    data = pickle.dumps(model)
+    atomic_write(os.path.join(out_dir, f"station_{station_id}.pkl"), data)
+    metrics["model_bytes"] = len(data)
+    metrics["train_seconds"] = round(time.perf_counter() - start, 3)
+    return station_id, metrics
+
+
+# Train every station, in parallel when workers > 1, and write the manifest.
+def train_all(partitions, out_dir, params, workers=1, test_size=0.2, seed=42, refit=True):
+    os.makedirs(out_dir, exist_ok=True)
+    start = time.perf_counter()
+    results = {}
+    failures = {}
+
+    if workers <= 1:
+        for station_id, station_data in partitions.items():
+            try:
+                _, metrics = train_station(station_id, station_data, out_dir, params, test_size, seed, refit)
+                results[station_id] = metrics
+                print(f"Station {station_id}: {metrics}")
+            except Exception as e:
+                failures[station_id] = str(e)
+                print(f"Station {station_id} failed: {e}")
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(train_station, station_id, station_data, out_dir, params, test_size, seed, refit): station_id
+                for station_id, station_data in partitions.items()
+            }
+            for future in as_completed(futures):
+                station_id = futures[future]
+                try:
+                    _, metrics = future.result()
+                    results[station_id] = metrics
+                    print(f"Station {station_id}: {metrics}")
+                except Exception as e:
+                    failures[station_id] = str(e)
+                    print(f"Station {station_id} failed: {e}")
+
+    manifest = {
+        "trained_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "features": FEATURES,
+        "params": params,
+        "seed": seed,
+        "test_size": test_size,
+        "refit": refit,
+        "total_seconds": round(time.perf_counter() - start, 3),
+        "stations": {str(station_id): results[station_id] for station_id in sorted(results)},
+        "failures": {str(station_id): error for station_id, error in sorted(failures.items())},
+    }
+    atomic_write(os.path.join(out_dir, MANIFEST_NAME), json.dumps(manifest, indent=2).encode("utf-8"))
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train one RandomForest model per station.")
+    parser.add_argument("--data", default="cleaned_historical_weather_data.csv", help="Cleaned CSV from the cleaning notebook")
+    parser.add_argument("--out", default="station_models", help="Directory to write station_<id>.pkl files to")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Stations trained in parallel")
+    parser.add_argument("--n-jobs", type=int, default=1, help="Threads per RandomForest (keep at 1 when workers > 1)")
+    parser.add_argument("--n-estimators", type=int, default=100)
+    parser.add_argument("--max-depth", type=int, default=None)
+    parser.add_argument("--min-samples-leaf", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--test-size", type=float, default=0.2, help="Holdout fraction used for the MAE in the manifest (0 to skip)")
+    parser.add_argument("--no-refit", action="store_true", help="Save the holdout model instead of refitting on all rows")
+    parser.add_argument("--stations", type=int, nargs="*", help="Only train these station ids")
+    parser.add_argument("--build-store", metavar="PATH", help="Also pack the trained models into a model store file")
+    args = parser.parse_args()
+
+    partitions = partition_by_station(args.data)
+    if args.stations:
+        partitions = {station_id: partitions[station_id] for station_id in args.stations if station_id in partitions}
+
+    params = {
+        "n_estimators": args.n_estimators,
+        "max_depth": args.max_depth,
+        "min_samples_leaf": args.min_samples_leaf,
+        "n_jobs": args.n_jobs,
+    }
+    manifest = train_all(partitions, args.out, params, args.workers, args.test_size, args.seed, not args.no_refit)
+    print(f"Trained {len(manifest['stations'])} stations in {manifest['total_seconds']}s, "
+          f"{len(manifest['failures'])} failed.")
+
+    if args.build_store:
+        from model_store import build_store_from_pickles
+        build_store_from_pickles(args.out, args.build_store)
+        print(f"Model store written to {args.build_store}")
+
+
+if __name__ == "__main__":
+    main()
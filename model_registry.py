@@ -0,0 +1,170 @@
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from forest_engine import CompiledForest
+
+# In-process registry of station models, kept in a bounded LRU so repeat predictions skip unpickling.
+# Models come from the shared memory-mapped store when one is given, then from compiled_dir, then from the pickles.
+class ModelRegistry:
+    def __init__(self, model_dir="station_models", max_models=None, max_bytes=None, compiled_dir=None, store=None):
+        self.model_dir = model_dir
+        self.compiled_dir = compiled_dir
+        self.store = store
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self._models = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._station_locks = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.loads = 0
+        self.load_seconds = 0.0
+
+    # Path of the pickle file for a station.
+    def model_path(self, station_id):
+        return os.path.join(self.model_dir, f"station_{station_id}.pkl")
+
+    # Station ids that have a model on disk. Files like "station_old.pkl" are not station models and are skipped.
+    def available_station_ids(self):
+        station_ids = list(self.store.station_ids()) if self.store is not None else []
+        for filename in os.listdir(self.model_dir):
+            if filename.startswith("station_") and filename.endswith(".pkl"):
+                try:
+                    station_ids.append(int(filename[len("station_"):-len(".pkl")]))
+                except ValueError:
+                    continue
+        return sorted(set(station_ids))
+
+    # Return the model for a station, loading it from disk on a miss.
+    def get(self, station_id):
+        with self._lock:
+            entry = self._models.get(station_id)
+            if entry is not None:
+                self._models.move_to_end(station_id)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            station_lock = self._station_locks.setdefault(station_id, threading.Lock())
+
+        # Only one thread unpickles a given station, others wait and reuse its result. The lock is only kept
+        # while a load is in flight, so there are never more of them than concurrent loads.
+        with station_lock:
+            try:
+                with self._lock:
+                    entry = self._models.get(station_id)
+                    if entry is not None:
+                        self._models.move_to_end(station_id)
+                        return entry[0]
+                model, size = self._load(station_id)
+                with self._lock:
+                    self._insert(station_id, model, size)
+                return model
+            finally:
+                with self._lock:
+                    if self._station_locks.get(station_id) is station_lock:
+                        del self._station_locks[station_id]
+
+    # Path of the compiled forest for a station, if compiled models are enabled.
+    def compiled_path(self, station_id):
+        if not self.compiled_dir:
+            return None
+        return os.path.join(self.compiled_dir, f"station_{station_id}.npz")
+
+    # Load a model (from the store, compiled, or pickled) and record how long it took.
+    def _load(self, station_id):
+        if self.store is not None and station_id in self.store:
+            start = time.perf_counter()
+            model = self.store.get(station_id)
+            with self._lock:
+                self.loads += 1
+                self.load_seconds += time.perf_counter() - start
+            return model, self.store.model_size(station_id)
+
+        compiled_path = self.compiled_path(station_id)
+        start = time.perf_counter()
+        if compiled_path and os.path.exists(compiled_path):
+            model_path = compiled_path
+            model = CompiledForest.load(compiled_path)
+        else:
+            model_path = self.model_path(station_id)
+            if not os.path.exists(model_path):
+                raise FileNotFoundError(f"Station ID {station_id} does not exist.")
+            with open(model_path, "rb") as file:
+                model = pickle.load(file)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.loads += 1
+            self.load_seconds += elapsed
+        return model, os.path.getsize(model_path)
+
+    # Add a model to the LRU and evict the least recently used ones until within limits.
+    def _insert(self, station_id, model, size):
+        if station_id in self._models:
+            self._bytes -= self._models.pop(station_id)[1]
+        self._models[station_id] = (model, size)
+        self._bytes += size
+        while len(self._models) > 1 and self._over_limit():
+            _, (_, evicted_size) = self._models.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+
+    def _over_limit(self):
+        if self.max_models is not None and len(self._models) > self.max_models:
+            return True
+        if self.max_bytes is not None and self._bytes > self.max_bytes:
+            return True
+        return False
+
+    # Load a set of stations (or every station on disk) ahead of the first request.
+    def preload(self, station_ids=None):
+        if station_ids is None:
+            station_ids = self.available_station_ids()
+        for station_id in station_ids:
+            try:
+                self.get(station_id)
+            except FileNotFoundError as e:
+                print(f"Skipping preload: {e}")
+
+    # Run preload in a daemon thread so startup is not blocked.
+    def warm_up(self, station_ids=None):
+        thread = threading.Thread(target=self.preload, args=(station_ids,), daemon=True)
+        thread.start()
+        return thread
+
+    # Drop every cached model and reset counters.
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.evictions = self.loads = 0
+            self.load_seconds = 0.0
+
+    # Cache counters for monitoring.
+    def stats(self):
+        with self._lock:
+            return {
+                "cached_models": len(self._models),
+                "cached_bytes": self._bytes,
+                "max_models": self.max_models,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "loads": self.loads,
+                "load_seconds": round(self.load_seconds, 4),
+                "store_version": self.store.version if self.store is not None else None,
+            }
+
+
+# Parse the MODEL_PRELOAD setting: "all", or a comma separated list of station ids.
+def parse_preload_setting(value):
+    if not value:
+        return None
+    value = value.strip().lower()
+    if value == "all":
+        return "all"
+    return [int(part) for part in value.split(",") if part.strip()]
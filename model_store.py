@@ -0,0 +1,156 @@
+import argparse
+import json
+import mmap
+import os
+import pickle
+import struct
+import time
+import numpy as np
+from forest_engine import CompiledForest
+
+# File layout:
+#   header  - MAGIC, format version (uint32), index offset (uint64), index length (uint64)
+#   arrays  - raw little-endian array bytes, each aligned to ALIGNMENT
+#   index   - JSON mapping station id -> {array name: [offset, dtype, shape]}
+# Workers open the file with mmap and build models as views over it, so they share the same physical pages.
+MAGIC = b"DBMSTORE"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sIQQ")
+ALIGNMENT = 64
+
+# Arrays of a compiled forest that are stored in the file rather than in the JSON index. is_leaf is
+# derivable from left but stored as well, so workers map it like the rest instead of each building a copy.
+ARRAY_NAMES = ["feature", "threshold", "left", "right", "value", "roots", "is_leaf"]
+
+
+# Write every forest into a single store file. forests maps station id -> CompiledForest.
+def build_store(forests, path):
+    index = {}
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(b"\0" * HEADER.size)
+        for station_id in sorted(forests):
+            forest = forests[station_id]
+            entry = {
+                "max_depth": forest.max_depth,
+                "feature_names": forest.feature_names,
+                "arrays": {},
+            }
+            for name in ARRAY_NAMES:
+                array = np.ascontiguousarray(getattr(forest, name))
+                array = array.astype(array.dtype.newbyteorder("<"), copy=False)
+                padding = -file.tell() % ALIGNMENT
+                file.write(b"\0" * padding)
+                entry["arrays"][name] = [file.tell(), array.dtype.str, list(array.shape)]
+                file.write(array.tobytes())
+            index[str(station_id)] = entry
+
+        index_bytes = json.dumps({
+            "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "stations": index,
+        }).encode("utf-8")
+        index_offset = file.tell()
+        file.write(index_bytes)
+        file.seek(0)
+        file.write(HEADER.pack(MAGIC, FORMAT_VERSION, index_offset, len(index_bytes)))
+    os.replace(tmp_path, path)
+    return path
+
+
+# Compile every pickled station model in model_dir and pack them into one store file.
+def build_store_from_pickles(model_dir, path):
+    forests = {}
+    for filename in sorted(os.listdir(model_dir)):
+        if filename.startswith("station_") and filename.endswith(".pkl"):
+            station_id = int(filename[len("station_"):-len(".pkl")])
+            with open(os.path.join(model_dir, filename), "rb") as file:
+                forests[station_id] = CompiledForest.from_sklearn(pickle.load(file))
+    return build_store(forests, path)
+
+
+# Read-only, memory-mapped view of a store file.
+class ModelStore:
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, index_offset, index_length = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a model store")
+        if version != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"Unsupported model store version {version}")
+
+        index = json.loads(self._mmap[index_offset:index_offset + index_length].decode("utf-8"))
+        self.built_at = index["built_at"]
+        self._stations = {int(station_id): entry for station_id, entry in index["stations"].items()}
+
+        # Identifies this particular build, e.g. for cache keys.
+        stat = os.stat(path)
+        self.version = f"{FORMAT_VERSION}-{self.built_at}-{stat.st_size}"
+
+    def station_ids(self):
+        return sorted(self._stations)
+
+    def __contains__(self, station_id):
+        return station_id in self._stations
+
+    # Size in bytes of one station's arrays in the file.
+    def model_size(self, station_id):
+        total = 0
+        for _, dtype, shape in self._stations[station_id]["arrays"].values():
+            total += np.dtype(dtype).itemsize * int(np.prod(shape))
+        return total
+
+    # Build a CompiledForest whose arrays are zero-copy views into the mapped file.
+    def get(self, station_id):
+        entry = self._stations.get(station_id)
+        if entry is None:
+            raise FileNotFoundError(f"Station ID {station_id} does not exist.")
+        arrays = {}
+        for name, (offset, dtype, shape) in entry["arrays"].items():
+            count = int(np.prod(shape))
+            arrays[name] = np.frombuffer(self._mmap, dtype=dtype, count=count, offset=offset).reshape(shape)
+        return CompiledForest(
+            arrays["feature"],
+            arrays["threshold"],
+            arrays["left"],
+            arrays["right"],
+            arrays["value"],
+            arrays["roots"],
+            entry["max_depth"],
+            entry["feature_names"],
+            # Stores written before is_leaf was stored get it computed.
+            arrays.get("is_leaf"),
+        )
+
+    def close(self):
+        # Views handed out by get() keep the mapping alive, so only drop our references.
+        self._mmap = None
+        self._file.close()
+
+
+# Open a store if the file exists, otherwise return None.
+def open_store(path):
+    if not path or not os.path.exists(path):
+        return None
+    return ModelStore(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack station models into one memory-mapped store file.")
+    parser.add_argument("--src", default="station_models", help="Directory of station_<id>.pkl files")
+    parser.add_argument("--out", default="station_models.bin", help="Store file to write")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    build_store_from_pickles(args.src, args.out)
+    store = ModelStore(args.out)
+    print(f"Packed {len(store.station_ids())} models into {args.out} "
+          f"({os.path.getsize(args.out) / 1024 / 1024:.1f} MB) in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,31 @@
+/*************************************************************
+ * Shared Station Loader
+ *************************************************************/
+// Fetches "/stations_list?format=compact" once per page and expands the columns back into
+// station objects shaped like the JCDecaux feed ("id" mirrors "number" for the prediction form).
+let stationsPromise = null;
+
+function loadStations() {
+  if (!stationsPromise) {
+    stationsPromise = fetch("/stations_list?format=compact")
+      .then(response => {
+        if (!response.ok) throw new Error("Network response not ok: " + response.statusText);
+        return response.json();
+      })
+      .then(columns => columns.number.map((number, i) => ({
+        number: number,
+        id: number,
+        name: columns.name[i],
+        status: columns.status[i],
+        position: { lat: columns.lat[i], lng: columns.lng[i] },
+        bike_stands: columns.bike_stands[i],
+        available_bikes: columns.available_bikes[i],
+        available_bike_stands: columns.available_bike_stands[i]
+      })));
+  }
+  return stationsPromise;
+}
+
 /*************************************************************
  * Weather Forecast Page - Custom Station Select + Prediction
  *************************************************************/
@@ -21,8 +49,7 @@ document.addEventListener("DOMContentLoaded", () => {
   });
 
   // Fetch stations securely from Flask backend
-  fetch("/stations_list")
-    .then(response => response.json())
+  loadStations()
     .then(data => {
       dropdownContainer.innerHTML = '';
       realSelect.innerHTML = '<option value="">Select a station</option>';
@@ -164,11 +191,7 @@ document.addEventListener("DOMContentLoaded", () => {
   let markers = [];
   let selectedDestination = null;
 
-  fetch("/stations_list")
-    .then(response => {
-      if (!response.ok) throw new Error("Network response not ok: " + response.statusText);
-      return response.json();
-    })
+  loadStations()
     .then(data => {
       stationsData = data;
 
@@ -178,16 +201,8 @@ document.addEventListener("DOMContentLoaded", () => {
         const lat = station.position.lat;
         const lng = station.position.lng;
         const marker = L.marker([lat, lng]).addTo(map);
-        const statusFormatted = station.status.charAt(0).toUpperCase() + station.status.slice(1).toLowerCase();
 
-        marker.bindPopup(`
-          <div class="station-popup">
-            <h4>${station.name}</h4>
-            <p><strong>Available Bikes:</strong> ${station.available_bikes}</p>
-            <p><strong>Available Stands:</strong> ${station.available_bike_stands}</p>
-            <p><strong>Status:</strong> ${statusFormatted}</p>
-          </div>
-        `);
+        marker.bindPopup(stationPopupHtml(station));
 
         marker.on("click", () => {
           stationSelect.value = station.number;
@@ -198,9 +213,55 @@ document.addEventListener("DOMContentLoaded", () => {
       });
 
       updateHeatmap();
+      subscribeToStationUpdates();
     })
     .catch(error => console.error("Error fetching station data:", error));
 
+  function stationPopupHtml(station) {
+    const statusFormatted = station.status.charAt(0).toUpperCase() + station.status.slice(1).toLowerCase();
+    return `
+          <div class="station-popup">
+            <h4>${station.name}</h4>
+            <p><strong>Available Bikes:</strong> ${station.available_bikes}</p>
+            <p><strong>Available Stands:</strong> ${station.available_bike_stands}</p>
+            <p><strong>Status:</strong> ${statusFormatted}</p>
+          </div>
+        `;
+  }
+
+  // Apply one station's latest availability to its marker popup and the heatmap data.
+  function applyStationUpdate(update) {
+    const entry = markers.find(m => m.station.number === update.number);
+    if (!entry) return;
+    entry.station.status = update.status;
+    entry.station.available_bikes = update.available_bikes;
+    entry.station.available_bike_stands = update.available_bike_stands;
+    entry.marker.setPopupContent(stationPopupHtml(entry.station));
+  }
+
+  // Live availability over Server-Sent Events. The browser reconnects on its own and sends
+  // Last-Event-ID, so after a short drop only the missed changes are replayed.
+  function subscribeToStationUpdates() {
+    if (!window.EventSource) return;
+    const source = new EventSource("/stations_stream");
+
+    source.addEventListener("snapshot", event => {
+      const columns = JSON.parse(event.data);
+      columns.number.forEach((number, i) => applyStationUpdate({
+        number: number,
+        status: columns.status[i],
+        available_bikes: columns.available_bikes[i],
+        available_bike_stands: columns.available_bike_stands[i]
+      }));
+      if (heatmapVisible) updateHeatmap();
+    });
+
+    source.addEventListener("delta", event => {
+      JSON.parse(event.data).changed.forEach(applyStationUpdate);
+      if (heatmapVisible) updateHeatmap();
+    });
+  }
+
   /*************************************************************
  * 5b) Address Based Routing with Autocomplete
  *************************************************************/
@@ -0,0 +1,117 @@
+import gzip
+import hashlib
+import json
+
+# Brotli is optional; without it responses are only gzip-compressed.
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Fields the map page uses, in the order of the compact columnar format.
+COMPACT_FIELDS = [
+    "number", "name", "status", "lat", "lng", "bike_stands", "available_bikes", "available_bike_stands",
+]
+
+# Fields whose change makes a station part of a live delta.
+DELTA_FIELDS = ["available_bikes", "available_bike_stands", "status"]
+
+# Content encodings the snapshot can produce, best first.
+SUPPORTED_ENCODINGS = (["br"] if brotli is not None else []) + ["gzip"]
+
+# One station from the JCDecaux feed, without a per-instance __dict__.
+class StationRecord:
+    __slots__ = (
+        "number", "name", "address", "status", "bike_stands", "available_bikes",
+        "available_bike_stands", "lat", "lng", "banking", "bonus", "last_update",
+    )
+
+    def __init__(self, station):
+        position = station.get("position") or {}
+        self.number = station["number"]
+        self.name = station.get("name")
+        self.address = station.get("address")
+        self.status = station.get("status")
+        self.bike_stands = station.get("bike_stands")
+        self.available_bikes = station.get("available_bikes")
+        self.available_bike_stands = station.get("available_bike_stands")
+        self.lat = position.get("lat")
+        self.lng = position.get("lng")
+        self.banking = station.get("banking")
+        self.bonus = station.get("bonus")
+        self.last_update = station.get("last_update")
+
+
+# A parsed JCDecaux feed, built once per fetch: records indexed by station number, the /stations
+# projection, and both responses already serialised to JSON bytes.
+class StationSnapshot:
+    def __init__(self, raw):
+        self.raw = raw
+        self.records = [StationRecord(station) for station in raw]
+        self.by_number = {record.number: record for record in self.records}
+
+        self.stations_projection = [
+            {"name": record.name, "id": record.number, "status": record.status}
+            for record in self.records
+        ]
+        self.raw_json = json.dumps(raw, separators=(",", ":")).encode("utf-8")
+        self.stations_json = json.dumps(self.stations_projection, separators=(",", ":")).encode("utf-8")
+
+        # Content hash, used as the ETag, and the newest station update (JCDecaux sends milliseconds).
+        self.etag = hashlib.sha1(self.raw_json).hexdigest()[:20]
+        updates = [record.last_update for record in self.records if record.last_update]
+        self.last_modified = max(updates) / 1000 if updates else None
+
+        self._compact_json = None
+        self._encoded = {}
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.raw)
+
+    def __eq__(self, other):
+        return isinstance(other, StationSnapshot) and self.raw == other.raw
+
+    # Columnar JSON with only the fields the map uses: {"number": [...], "name": [...], ...}.
+    @property
+    def compact_json(self):
+        if self._compact_json is None:
+            columns = {field: [getattr(record, field) for record in self.records] for field in COMPACT_FIELDS}
+            self._compact_json = json.dumps(columns, separators=(",", ":")).encode("utf-8")
+        return self._compact_json
+
+    # Response body for a format ("full" or "compact") and content encoding ("br", "gzip" or None).
+    # Compressed bodies are built once per snapshot and reused for every request.
+    def encoded(self, format, encoding=None):
+        key = (format, encoding)
+        if key not in self._encoded:
+            body = self.compact_json if format == "compact" else self.raw_json
+            if encoding == "br":
+                body = brotli.compress(body)
+            elif encoding == "gzip":
+                body = gzip.compress(body, compresslevel=6)
+            self._encoded[key] = body
+        return self._encoded[key]
+
+    # Stations added or whose DELTA_FIELDS changed since a previous snapshot, as compact dicts,
+    # plus the numbers of stations that disappeared from the feed.
+    def changes_since(self, previous):
+        changed = []
+        for record in self.records:
+            old = previous.by_number.get(record.number) if previous is not None else None
+            if old is None or any(getattr(record, field) != getattr(old, field) for field in DELTA_FIELDS):
+                changed.append({field: getattr(record, field) for field in COMPACT_FIELDS})
+        removed = [number for number in previous.by_number if number not in self.by_number] if previous is not None else []
+        return changed, removed
+
+    def get(self, number):
+        return self.by_number.get(number)
+
+    # Available docks for a station, or 0 when it is not in the feed.
+    def available_docks(self, number):
+        record = self.by_number.get(number)
+        if record is None or record.available_bike_stands is None:
+            return 0
+        return record.available_bike_stands
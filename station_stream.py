@@ -0,0 +1,157 @@
+import json
+import threading
+from collections import deque
+
+# One pushed change set: its id, the SSE event name and the encoded payload.
+class StreamEvent:
+    __slots__ = ("id", "name", "data")
+
+    def __init__(self, id, name, data):
+        self.id = id
+        self.name = name
+        self.data = data
+
+    # Wire format of the event.
+    def encode(self):
+        return f"id: {self.id}\nevent: {self.name}\ndata: {self.data}\n\n"
+
+
+# Fans one upstream poll out to every connected client. A single poller thread reads the shared
+# snapshot cache; whenever its version changes, the stations whose availability or status changed
+# become one "delta" event in a ring buffer. Clients resume from Last-Event-ID while that id is
+# still buffered and receive a full "snapshot" event otherwise.
+class StationStream:
+    def __init__(self, source, poll_seconds=30, buffer_size=256, heartbeat_seconds=15):
+        self.source = source
+        self.poll_seconds = poll_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.events = deque(maxlen=buffer_size)
+        self.last_id = 0
+        self._stations = None
+        self._version = None
+        self._condition = threading.Condition()
+        self._poll_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.clients = 0
+        self.polls = 0
+        self.deltas = 0
+
+    # Read the current snapshot and record a delta event if it changed since the last poll.
+    def poll(self):
+        with self._poll_lock:
+            snapshot = self.source()
+            self.polls += 1
+            if snapshot.version == self._version:
+                return None
+
+            stations = snapshot.value
+            changed, removed = stations.changes_since(self._stations)
+            with self._condition:
+                event = None
+                if self._stations is not None and (changed or removed):
+                    self.last_id += 1
+                    data = json.dumps({"changed": changed, "removed": removed}, separators=(",", ":"))
+                    event = StreamEvent(self.last_id, "delta", data)
+                    self.events.append(event)
+                    self.deltas += 1
+                self._stations = stations
+                self._version = snapshot.version
+                self._condition.notify_all()
+            return event
+
+    # Full state as a "snapshot" event carrying the id of the latest delta it already includes.
+    def snapshot_event(self):
+        with self._condition:
+            stations, last_id = self._stations, self.last_id
+        return StreamEvent(last_id, "snapshot", stations.compact_json.decode("utf-8"))
+
+    # Buffered events after last_id, or None when the client is too far behind (or new) to catch up.
+    def events_since(self, last_id):
+        with self._condition:
+            if last_id is None or last_id > self.last_id:
+                return None
+            if last_id == self.last_id:
+                return []
+            if not self.events or self.events[0].id > last_id + 1:
+                return None
+            return [event for event in self.events if event.id > last_id]
+
+    # Parse a Last-Event-ID header or query value; anything unusable means "start fresh".
+    @staticmethod
+    def parse_last_event_id(value):
+        try:
+            return int(value) if value not in (None, "") else None
+        except ValueError:
+            return None
+
+    # Generator of SSE text for one client. Sends a snapshot or the missed deltas first, then
+    # new deltas as they arrive and a comment line every heartbeat_seconds to keep proxies from timing out.
+    def subscribe(self, last_id=None):
+        with self._condition:
+            self.clients += 1
+        try:
+            # Bring the stream up to date first; the poller may have been idle with no clients.
+            self.start()
+            self.poll()
+            yield f"retry: {int(self.poll_seconds * 1000)}\n\n"
+            backlog = self.events_since(last_id)
+            if backlog is None:
+                event = self.snapshot_event()
+                last_id = event.id
+                yield event.encode()
+            else:
+                for event in backlog:
+                    last_id = event.id
+                    yield event.encode()
+
+            while not self._stop.is_set():
+                with self._condition:
+                    if self.last_id == last_id:
+                        self._condition.wait(self.heartbeat_seconds)
+                pending = self.events_since(last_id)
+                if pending is None:
+                    event = self.snapshot_event()
+                    last_id = event.id
+                    yield event.encode()
+                elif pending:
+                    for event in pending:
+                        last_id = event.id
+                        yield event.encode()
+                else:
+                    yield ": keep-alive\n\n"
+        finally:
+            with self._condition:
+                self.clients -= 1
+
+    # Poll only while someone is listening, so an idle server does not keep the upstream busy.
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self.clients:
+                    self.poll()
+            except Exception as e:
+                print(f"Station stream poll failed: {e}")
+            self._stop.wait(self.poll_seconds)
+
+    # Start the poller thread if it is not already running.
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="station-stream", daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop.set()
+        with self._condition:
+            self._condition.notify_all()
+
+    def stats(self):
+        return {
+            "clients": self.clients,
+            "last_event_id": self.last_id,
+            "buffered_events": len(self.events),
+            "polls": self.polls,
+            "deltas": self.deltas,
+        }
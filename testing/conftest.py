@@ -0,0 +1,35 @@
+# Shared pytest fixtures. Upstream caches in "app.py" are cleared before each test so mocked responses never leak between tests.
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+@pytest.fixture(autouse=True)
+def clear_upstream_caches():
+    app_module = sys.modules.get("app")
+    if app_module is not None:
+        app_module.bike_snapshot_cache.clear()
+        app_module.weather_forecast_cache.clear()
+    yield
+
+# Fixture that writes a small cleaned CSV with three stations, for the training and compaction tests.
+@pytest.fixture
+def cleaned_csv(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 300
+    data = pd.DataFrame({
+        "station_id": rng.choice([1, 2, 3], n),
+        "num_docks_available": rng.integers(0, 30, n),
+        "year": 2024,
+        "month": 5,
+        "day": rng.integers(1, 29, n),
+        "hour": rng.integers(0, 24, n),
+        "minute": 0,
+        "avg_air_temp": rng.uniform(0, 20, n),
+        "avg_humidity": rng.uniform(50, 100, n),
+        "day_name": rng.integers(0, 7, n),
+    })
+    data["num_bikes_available"] = 30 - data["num_docks_available"]
+    path = tmp_path / "cleaned.csv"
+    data.to_csv(path, index=False)
+    return path
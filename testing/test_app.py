@@ -119,4 +119,129 @@ def test_duplicate_signup(client):
     response = client.post('/signup', data={'username': 'dupe', 'password': '456'}, follow_redirects=True)
     assert response.status_code == 200
     users = User.query.filter_by(username='dupe').all()
-    assert len(users) == 1
\ No newline at end of file
+    assert len(users) == 1
+
+# Testing the batch predict API groups rows by station and fetches upstream data once.
+@patch('app.fetch_live_bike_data_dublin')
+@patch('app.fetch_weather_forecast_dublin')
+@patch('app.load_station_model')
+def test_predict_batch_api(mock_model, mock_weather, mock_bike_data, client):
+    login_user(client)
+
+    mock_model.return_value.predict.side_effect = lambda rows: [7] * len(rows)
+    mock_weather.return_value = [{"dt": 1744628400, "main": {"temp": 15, "humidity": 80}}]
+    mock_bike_data.return_value = [{"number": 101, "available_bike_stands": 10}]
+
+    response = client.post('/predict_batch', json={"items": [
+        {"station_id": 101, "date": "2025-04-14", "time": "12:00"},
+        {"station_id": 101, "date": "2025-04-14", "time": "13:00"},
+        {"station_id": 102, "date": "2025-04-14", "time": "12:00:00"}
+    ]})
+    assert response.status_code == 200
+    data = json.loads(response.data)["predictions"]
+    assert [row["station_id"] for row in data] == [101, 101, 102]
+    assert all(row["predicted_available_bikes"] == 7 for row in data)
+    assert mock_weather.call_count == 1
+    assert mock_bike_data.call_count == 1
+    assert mock_model.call_count == 2
+
+# Testing that batch predictions read live docks from the snapshot the station routes already cached.
+@patch('app.fetch_live_bike_data_dublin')
+@patch('app.fetch_weather_forecast_dublin')
+@patch('app.load_station_model')
+def test_predict_batch_uses_snapshot_cache(mock_model, mock_weather, mock_bike_data, client):
+    from datetime import datetime
+    from app import predict_bike_availability_batch
+    login_user(client)
+    mock_model.return_value.predict.side_effect = lambda rows: [len(rows)] * len(rows)
+    mock_weather.return_value = [{"dt": 1744628400, "main": {"temp": 15, "humidity": 80}}]
+    mock_bike_data.return_value = [{"number": 101, "name": "Station A", "status": "OPEN", "available_bike_stands": 10}]
+
+    client.get('/stations_list')
+    now = datetime(2025, 4, 14, 11, 0)
+    predict_bike_availability_batch([(101, datetime(2025, 4, 14, 12, 0))], now)
+    predict_bike_availability_batch([(101, datetime(2025, 4, 14, 13, 0))], now)
+    assert mock_bike_data.call_count == 1
+    assert mock_model.return_value.predict.call_args[0][0]["num_docks_available"].tolist() == [10]
+
+# Testing that batch predictions look live docks up in the snapshot index instead of scanning the feed.
+@patch('app.fetch_live_bike_data_dublin')
+@patch('app.fetch_weather_forecast_dublin')
+@patch('app.load_station_model')
+def test_predict_batch_uses_snapshot_index(mock_model, mock_weather, mock_bike_data, client):
+    from datetime import datetime
+    from app import predict_bike_availability_batch
+    from station_snapshot import StationSnapshot
+    mock_model.return_value.predict.side_effect = lambda rows: [len(rows)] * len(rows)
+    mock_weather.return_value = [{"dt": 1744628400, "main": {"temp": 15, "humidity": 80}}]
+    mock_bike_data.return_value = [{"number": n, "available_bike_stands": n % 7} for n in range(1, 120)]
+
+    now = datetime(2025, 4, 14, 11, 0)
+    with patch.object(StationSnapshot, "__iter__", side_effect=AssertionError("linear scan")):
+        predict_bike_availability_batch([(101, datetime(2025, 4, 14, 12, 0)), (500, datetime(2025, 4, 14, 12, 0))], now)
+    docks = [call[0][0]["num_docks_available"].tolist() for call in mock_model.return_value.predict.call_args_list]
+    assert docks == [[101 % 7], [0]]
+
+# Testing the batch predict API rejects a body without items or a time window.
+def test_predict_batch_api_bad_request(client):
+    login_user(client)
+    response = client.post('/predict_batch', json={"station_id": 1})
+    assert response.status_code == 400
+
+# Testing that station routes share one cached snapshot and report its age.
+@patch('app.fetch_live_bike_data_dublin')
+def test_station_routes_share_snapshot(mock_fetch_data, client):
+    login_user(client)
+    mock_fetch_data.return_value = [{"name": "Station A", "number": 101, "status": "OPEN"}]
+    first = client.get('/stations')
+    second = client.get('/stations_list')
+    assert first.status_code == 200 and second.status_code == 200
+    assert "X-Snapshot-Age" in second.headers
+    assert mock_fetch_data.call_count == 1
+
+# Testing ETag revalidation, gzip compression and the compact format of /stations_list.
+@patch('app.fetch_live_bike_data_dublin')
+def test_stations_list_conditional_and_compact(mock_fetch_data, client):
+    import gzip
+    mock_fetch_data.return_value = [{
+        "number": 1, "name": "Station A", "status": "OPEN", "bike_stands": 20,
+        "available_bikes": 5, "available_bike_stands": 15,
+        "position": {"lat": 53.3, "lng": -6.2}, "last_update": 1744628400000
+    }]
+
+    response = client.get('/stations_list', headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(response.data)) == mock_fetch_data.return_value
+
+    etag = response.headers["ETag"]
+    response = client.get('/stations_list', headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b""
+
+    response = client.get('/stations_list?format=compact')
+    data = json.loads(response.data)
+    assert data["number"] == [1]
+    assert data["lat"] == [53.3]
+    assert "contract_name" not in data
+    assert response.headers["ETag"] != etag
+
+# Testing that /stations_stream opens with a full snapshot event.
+@patch('app.fetch_live_bike_data_dublin')
+def test_stations_stream(mock_fetch_data, client):
+    from app import station_stream
+    mock_fetch_data.return_value = [{
+        "number": 1, "name": "Station A", "status": "OPEN", "bike_stands": 20,
+        "available_bikes": 5, "available_bike_stands": 15, "position": {"lat": 53.3, "lng": -6.2}
+    }]
+    response = client.get('/stations_stream', buffered=False)
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+
+    chunks = response.response
+    assert next(chunks).startswith(b"retry:")
+    event = next(chunks).decode("utf-8")
+    assert "event: snapshot" in event
+    assert '"available_bikes":[5]' in event
+    response.close()
+    station_stream.stop()
@@ -0,0 +1,88 @@
+# Tests for the day-partitioned availability archive. To run type "python -m pytest testing/test_availability_archive.py -v" from the directory where "app.py" is located.
+import datetime
+import numpy as np
+import pandas as pd
+from availability_archive import DAY_COUNTS_QUERY, AvailabilityArchive, compact, compact_csv
+from storage import SQLiteStorage
+
+ROWS = [
+    (2, 6, 14, "OPEN", "2025-04-14 08:00:00"),
+    (1, 5, 15, "OPEN", "2025-04-14 08:00:00"),
+    (1, 4, 16, "CLOSED", "2025-04-14 23:55:00"),
+    (1, 3, 17, "OPEN", "2025-04-15 00:05:00"),
+    (1, 2, 18, "OPEN", "2025-04-16 09:00:00"),
+]
+FRAME = pd.DataFrame(ROWS, columns=["number", "available_bikes", "available_bike_stands", "status", "last_update"])
+
+# Testing that closed days are compacted from a storage backend, one file per day, and not twice.
+def test_compact_from_storage(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / "bikes.db"))
+    storage.ensure_tables(["station", "availability"])
+    storage.upsert_stations([(number, "dublin", "", "", True, False, 20, 53.3, -6.2, "OPEN") for number in (1, 2)])
+    storage.append_availability(ROWS)
+
+    archive = AvailabilityArchive(str(tmp_path / "archive"))
+    written = compact(storage, archive, today=datetime.date(2025, 4, 16))
+    assert written == {datetime.date(2025, 4, 14): 3, datetime.date(2025, 4, 15): 1}
+    assert archive.days() == [datetime.date(2025, 4, 14), datetime.date(2025, 4, 15)]
+    assert compact(storage, archive, today=datetime.date(2025, 4, 16)) == {}
+    storage.close()
+
+# Testing that a compacted day is archived again when late rows reach the table, e.g. from a spool flushed after an outage.
+def test_compact_picks_up_late_rows(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / "bikes.db"))
+    storage.ensure_tables(["station", "availability"])
+    storage.upsert_stations([(number, "dublin", "", "", True, False, 20, 53.3, -6.2, "OPEN") for number in (1, 2)])
+    storage.append_availability(ROWS[:2])
+
+    archive = AvailabilityArchive(str(tmp_path / "archive"))
+    assert compact(storage, archive, today=datetime.date(2025, 4, 15)) == {datetime.date(2025, 4, 14): 2}
+    storage.append_availability(ROWS[2:3])
+    assert compact(storage, archive, today=datetime.date(2025, 4, 15)) == {datetime.date(2025, 4, 14): 3}
+    assert archive.row_count(datetime.date(2025, 4, 14)) == 3
+    storage.close()
+
+# Testing that the nightly count only reads days after the last archived one and within the recheck window.
+def test_compact_bounds_day_counts(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / "bikes.db"))
+    storage.ensure_tables(["station", "availability"])
+    storage.upsert_stations([(number, "dublin", "", "", True, False, 20, 53.3, -6.2, "OPEN") for number in (1, 2)])
+    storage.append_availability(ROWS[:2] + ROWS[3:])
+    archive = AvailabilityArchive(str(tmp_path / "archive"))
+    compact(storage, archive, today=datetime.date(2025, 4, 17))
+
+    # A late row for the 14th is picked up within the window, but not once the 14th is outside it.
+    storage.append_availability(ROWS[2:3])
+    assert compact(storage, archive, today=datetime.date(2025, 4, 17), recheck_days=1) == {}
+    assert compact(storage, archive, today=datetime.date(2025, 4, 17), recheck_days=3) == {datetime.date(2025, 4, 14): 3}
+
+    _, plan = storage.explain(DAY_COUNTS_QUERY, ("2025-04-16 00:00:00",))
+    assert "USING COVERING INDEX availability_last_update (last_update>?)" in plan[0][-1]
+    storage.close()
+
+# Testing that reads only return the requested range, columns and stations.
+def test_archive_range_and_column_reads(tmp_path):
+    archive = AvailabilityArchive(str(tmp_path / "archive"))
+    for day, rows in FRAME.groupby(pd.to_datetime(FRAME["last_update"]).dt.date):
+        archive.write_day(day, rows)
+
+    data = archive.load(start="2025-04-14 12:00", end="2025-04-16", columns=["available_bikes"])
+    assert list(data) == ["available_bikes"]
+    assert data["available_bikes"].tolist() == [4, 3]
+
+    frame = archive.to_frame(end="2025-04-15", stations=[1])
+    assert frame["available_bikes"].tolist() == [5, 4]
+    assert frame["status"].tolist() == ["OPEN", "CLOSED"]
+    assert frame["timestamp"].iloc[0] == pd.Timestamp("2025-04-14 08:00:00")
+
+    # Rows within a day are sorted by time, then station.
+    assert archive.load(end="2025-04-14 09:00", columns=["number"])["number"].tolist() == [1, 2]
+    assert archive.load(start="2030-01-01")["number"].dtype == np.int32
+
+# Testing that a flat CSV is archived by day, skipping the day that is still open.
+def test_compact_csv(tmp_path):
+    csv_path = tmp_path / "availability.csv"
+    FRAME.to_csv(csv_path, index_label="id")
+    archive = AvailabilityArchive(str(tmp_path / "archive"))
+    written = compact_csv(str(csv_path), archive, today=datetime.date(2025, 4, 16))
+    assert sorted(written) == [datetime.date(2025, 4, 14), datetime.date(2025, 4, 15)]
@@ -0,0 +1,23 @@
+# Tests for rebuilding regular availability series from change rows. To run type "python -m pytest testing/test_availability_series.py -v" from the directory where "app.py" is located.
+import pandas as pd
+from data_scraping.availability_series import reconstruct_series
+
+CHANGES = pd.DataFrame([
+    (1, 5, 15, "OPEN", "2025-04-14 07:58:00"),
+    (2, 9, 11, "OPEN", "2025-04-14 08:06:00"),
+    (1, 3, 17, "OPEN", "2025-04-14 08:07:30"),
+], columns=["number", "available_bikes", "available_bike_stands", "status", "last_update"])
+
+# Testing that each slot carries the latest change at or before it.
+def test_reconstruct_series_forward_fills():
+    series = reconstruct_series(CHANGES, "2025-04-14 08:00", "2025-04-14 08:10", freq="5min")
+    station_1 = series[series["number"] == 1]
+    assert station_1["available_bikes"].tolist() == [5, 5, 3]
+    assert station_1["last_update"].dt.strftime("%H:%M").tolist() == ["08:00", "08:05", "08:10"]
+    assert list(series.columns) == ["number", "available_bikes", "available_bike_stands", "status", "last_update"]
+
+# Testing that slots before a station's first observation are left out.
+def test_reconstruct_series_skips_before_first_observation():
+    series = reconstruct_series(CHANGES, "2025-04-14 08:00", "2025-04-14 08:10", freq="5min", station_ids=[2, 3])
+    assert series["number"].tolist() == [2]
+    assert series["available_bike_stands"].tolist() == [11]
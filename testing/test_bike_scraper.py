@@ -0,0 +1,155 @@
+# Tests for the bike scraper's database writes. To run type "python -m pytest testing/test_bike_scraper.py -v" from the directory where "app.py" is located.
+import os
+import sys
+import types
+import pytest
+from storage import SQLiteStorage
+
+# The scraper reads its settings from a local "dbinfo" module that is not checked in; these tests supply one.
+# The fake module, the path entry and the scraper imported against them are all removed again afterwards.
+@pytest.fixture(scope="module")
+def scraper():
+    dbinfo = types.ModuleType("dbinfo")
+    dbinfo.NAME = "dublin"
+    dbinfo.STATIONS_URI = "https://api.jcdecaux.com/vls/v1/stations"
+    dbinfo.JCKEY = "key"
+    dbinfo.STORAGE_URL = "sqlite:///:memory:"
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setitem(sys.modules, "dbinfo", dbinfo)
+        monkeypatch.syspath_prepend(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data_scraping"))
+        import data_scraping
+        from data_scraping import bike_scraper
+        yield bike_scraper
+        sys.modules.pop("data_scraping.bike_scraper", None)
+        monkeypatch.delattr(data_scraping, "bike_scraper", raising=False)
+
+# SQLite database with the scraper's tables.
+@pytest.fixture
+def db(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / "bikes.db"))
+    storage.ensure_tables(["station", "availability"])
+    yield storage
+    storage.close()
+
+# Spool in a temporary directory.
+@pytest.fixture
+def spool(tmp_path):
+    from data_scraping.spool import Spool
+    spool = Spool(str(tmp_path / "spool.sqlite3"))
+    yield spool
+    spool.close()
+
+# Storage that is down: every write fails.
+class DownStorage:
+    def write(self, rows_by_table):
+        raise ConnectionError("database unreachable")
+
+STATIONS = [
+    {"number": number, "name": f"Station {number}", "address": "Street", "banking": True, "bonus": False,
+     "bike_stands": 20, "available_bikes": 5, "available_bike_stands": 15, "status": "OPEN",
+     "position": {"lat": 53.3, "lng": -6.2}}
+    for number in (1, 2, 3)
+]
+
+# Spools a snapshot and drains it into the database, returning the spool counts.
+def store(scraper, spool, db, stations, **kwargs):
+    counts = scraper.store_snapshot(spool, stations, **kwargs)
+    scraper.flush_spool(spool, db)
+    return counts
+
+def rows(db, table):
+    return db.query(f"SELECT * FROM {table} ORDER BY 1")[1]
+
+# Testing that a whole snapshot ends up in the station and availability tables.
+def test_store_snapshot(scraper, spool, db):
+    assert store(scraper, spool, db, STATIONS, timestamp="2025-04-14 08:00:00", fingerprints={})
+    stations = rows(db, "station")
+    assert [row[0] for row in stations] == [1, 2, 3]
+    assert stations[0][1] == "dublin"
+    assert rows(db, "availability")[0][1:] == (1, 5, 15, "OPEN", "2025-04-14 08:00:00")
+    assert len(spool) == 0
+
+# Testing that rows stay spooled while the database is down and are written once it is back.
+def test_failed_flush_keeps_rows_spooled(scraper, spool, db):
+    scraper.store_snapshot(spool, STATIONS, fingerprints={})
+    assert scraper.flush_spool(spool, DownStorage()) == 0
+    assert len(spool) == 6
+
+    assert scraper.flush_spool(spool, db) == 6
+    assert len(spool) == 0
+    assert len(rows(db, "availability")) == 3
+
+# Testing that replaying an already written batch changes nothing.
+def test_replayed_batch_is_idempotent(scraper, spool, db):
+    scraper.store_snapshot(spool, STATIONS, timestamp="2025-04-14 08:00:00", fingerprints={})
+    _, batch = spool.peek(100)
+    db.write(batch)
+    db.write(batch)
+    assert len(rows(db, "availability")) == 3
+    assert len(rows(db, "station")) == 3
+
+# Testing that unchanged station metadata is not upserted again.
+def test_store_snapshot_skips_unchanged_metadata(scraper, spool, db):
+    fingerprints = {}
+    first = store(scraper, spool, db, STATIONS, timestamp="2025-04-14 08:00:00", fingerprints=fingerprints)
+    assert first["stations_written"] == 3
+
+    renamed = [dict(STATIONS[0], name="Renamed")] + STATIONS[1:]
+    counts = store(scraper, spool, db, renamed, timestamp="2025-04-14 08:05:00", fingerprints=fingerprints)
+    assert counts["stations_written"] == 1 and counts["stations_skipped"] == 2
+    assert counts["availability_written"] == 3
+    assert rows(db, "station")[0][2] == "Renamed"
+
+    counts = store(scraper, spool, db, renamed, timestamp="2025-04-14 08:10:00", fingerprints=fingerprints)
+    assert counts["stations_written"] == 0
+    assert len(rows(db, "availability")) == 9
+
+# Testing that change-data-capture mode only stores new observations, stamped with the feed's last_update.
+def test_store_snapshot_changes_only(scraper, spool, db):
+    state = {}
+    stations = [dict(station, last_update=1744617600000) for station in STATIONS]
+    counts = store(scraper, spool, db, stations, fingerprints={}, changes_only=True, state=state)
+    assert counts["availability_written"] == 3
+    assert rows(db, "availability")[0][5] == scraper.feed_timestamp(1744617600000)
+
+    # Station 1 changed, station 2 reported again with the same values, station 3 not refreshed by the feed.
+    later = [
+        dict(stations[0], available_bikes=4, available_bike_stands=16, last_update=1744617900000),
+        dict(stations[1], last_update=1744617900000),
+        stations[2],
+    ]
+    counts = store(scraper, spool, db, later, fingerprints={}, changes_only=True, state=state)
+    assert counts["availability_written"] == 1
+    assert counts["availability_skipped"] == 2
+    assert rows(db, "availability")[-1][1:] == (1, 4, 16, "OPEN", scraper.feed_timestamp(1744617900000))
+    assert state[1] == (1744617900000, (4, 16, "OPEN"))
+
+# Testing that in change-data-capture mode a station without a feed last_update is stamped with the cycle time.
+def test_store_snapshot_changes_only_without_last_update(scraper, spool, db):
+    state = {}
+    station = {key: value for key, value in STATIONS[0].items() if key != "last_update"}
+    counts = store(scraper, spool, db, [station], timestamp="2025-04-14 08:00:00", fingerprints={}, changes_only=True, state=state)
+    assert counts["availability_written"] == 1
+    assert rows(db, "availability")[-1][5] == "2025-04-14 08:00:00"
+
+    store(scraper, spool, db, [station], timestamp="2025-04-14 08:05:00", fingerprints={}, changes_only=True, state=state)
+    store(scraper, spool, db, [dict(station, available_bikes=6)], timestamp="2025-04-14 08:10:00",
+          fingerprints={}, changes_only=True, state=state)
+    assert [row[5] for row in rows(db, "availability")] == ["2025-04-14 08:00:00", "2025-04-14 08:10:00"]
+
+# Testing that a dead-lettered station upsert drops its fingerprint, so the next cycle upserts the station again.
+def test_dead_lettered_station_is_upserted_again(scraper, tmp_path):
+    import sqlite3
+    from data_scraping.spool import Spool
+    spool = Spool(str(tmp_path / "poison.sqlite3"), max_attempts=1)
+    fingerprints, state = {}, {}
+
+    def write(rows_by_table):
+        if any(row[0] == 2 for row in rows_by_table.get("station", [])):
+            raise sqlite3.IntegrityError("Data too long for column 'name'")
+
+    scraper.store_snapshot(spool, STATIONS, fingerprints=fingerprints)
+    spool.flush(write, on_dead_letter=lambda kind, row: scraper.forget_dead_letter(kind, row, fingerprints, state))
+    assert sorted(fingerprints) == [1, 3]
+    assert scraper.store_snapshot(spool, STATIONS, fingerprints=fingerprints)["stations_written"] == 1
+    spool.close()
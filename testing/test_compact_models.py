@@ -0,0 +1,16 @@
+# Tests for the model compaction report. To run type "python -m pytest testing/test_compact_models.py -v" from the directory where "app.py" is located.
+from machine_learning.compact_models import build_report, parse_setting
+from machine_learning.train_models import partition_by_station
+
+# Testing that compaction settings are parsed and the report covers every setting.
+def test_compaction_report(cleaned_csv):
+    assert parse_setting("n_estimators=10,max_depth=none") == {"n_estimators": 10, "max_depth": None, "min_samples_leaf": 1}
+    settings = [
+        parse_setting("n_estimators=10,max_depth=none,min_samples_leaf=1"),
+        parse_setting("n_estimators=3,max_depth=2,min_samples_leaf=5"),
+    ]
+    partitions = partition_by_station(cleaned_csv)
+    report = build_report({1: partitions[1]}, settings, repeat=1)
+    assert len(report) == 2
+    assert report[0]["mae_change"] == 0
+    assert report[1]["model_kb"] < report[0]["model_kb"]
@@ -0,0 +1,98 @@
+# Tests for the streaming CSV exports in "flask/db_to_csv.py". To run type "python -m pytest testing/test_db_to_csv.py -v" from the directory where "app.py" is located.
+import csv
+import gzip
+import importlib.util
+import io
+import os
+import pytest
+from storage import SQLiteStorage
+
+# Loads the export app against a temporary SQLite database holding a few hundred availability rows.
+@pytest.fixture
+def exports(tmp_path, monkeypatch):
+    path = str(tmp_path / "bikes.db")
+    storage = SQLiteStorage(path)
+    storage.ensure_tables()
+    storage.upsert_stations([(1, "dublin", "Station 1", "Street", True, False, 20, 53.3, -6.2, "OPEN")])
+    storage.append_availability([(1, i % 20, 20 - i % 20, "OPEN", f"2025-04-14 {i // 60:02d}:{i % 60:02d}:00") for i in range(250)])
+    storage.close()
+
+    monkeypatch.setenv("BIKE_STORAGE_URL", f"sqlite:///{path}")
+    monkeypatch.setenv("WEATHER_STORAGE_URL", f"sqlite:///{path}")
+    module_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "flask", "db_to_csv.py")
+    spec = importlib.util.spec_from_file_location("db_to_csv", module_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.app.config["TESTING"] = True
+    return module
+
+# Testing that the CSV is produced in chunks and matches the table.
+def test_generate_csv_streams_in_chunks(exports):
+    column_names, rows = exports.bike_storage.stream_range("availability", chunk_size=100)
+    chunks = list(exports.generate_csv(column_names, rows))
+    assert len(chunks) == 4
+    rows = list(csv.reader(io.StringIO(b"".join(chunks).decode("utf-8"))))
+    assert rows[0] == ["id", "number", "available_bikes", "available_bike_stands", "status", "last_update"]
+    assert len(rows) == 251
+    assert rows[1] == ["1", "1", "0", "20", "OPEN", "2025-04-14 00:00:00"]
+
+# Testing the export route with and without gzip.
+def test_export_route_gzip(exports):
+    client = exports.app.test_client()
+    plain = client.get("/export/availability")
+    assert plain.status_code == 200
+    assert "Content-Encoding" not in plain.headers
+    assert plain.headers["Content-Disposition"] == "attachment;filename=availability.csv"
+
+    compressed = client.get("/export/availability", headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(compressed.data) == plain.data
+    assert len(compressed.data) < len(plain.data)
+
+# Testing that the export's connection is closed when the response is closed without reading the body.
+def test_export_closes_unread_body(exports, monkeypatch):
+    import sqlite3
+    connections = []
+    connect = exports.bike_storage.connect
+
+    def tracking_connect():
+        connections.append(connect())
+        return connections[-1]
+
+    monkeypatch.setattr(exports.bike_storage, "connect", tracking_connect)
+    client = exports.app.test_client()
+    for method in (client.get, client.head):
+        response = method("/export/availability", buffered=False)
+        response.close()
+        with pytest.raises(sqlite3.ProgrammingError):
+            connections[-1].execute("SELECT 1")
+
+# Testing the since, until and station filters and pulling only new rows with the cursor.
+def test_export_filters_and_cursor(exports):
+    client = exports.app.test_client()
+    response = client.get("/export/availability?since=2025-04-14T01:00:00&until=2025-04-14 02:00:00&station=1")
+    rows = list(csv.reader(io.StringIO(response.data.decode("utf-8"))))[1:]
+    assert len(rows) == 60
+    assert rows[0][-1] == "2025-04-14 01:00:00"
+    assert response.headers["X-Next-Cursor"] == "120"
+
+    full = client.get("/export/availability")
+    assert full.headers["X-Next-Cursor"] == "250"
+    exports.bike_storage.append_availability([(1, 3, 17, "OPEN", "2025-04-15 00:00:00")])
+    newer = client.get("/export/availability?cursor=250")
+    rows = list(csv.reader(io.StringIO(newer.data.decode("utf-8"))))[1:]
+    assert [row[0] for row in rows] == ["251"]
+    assert newer.headers["X-Next-Cursor"] == "251"
+    assert client.get("/export/availability?cursor=251").headers["X-Next-Cursor"] == "251"
+
+# Testing that invalid or unsupported filters are rejected.
+def test_export_filter_errors(exports):
+    client = exports.app.test_client()
+    assert client.get("/export/availability?since=yesterday").status_code == 400
+    assert client.get("/export/availability?station=a").status_code == 400
+    assert client.get("/export/availability?cursor=-1").status_code == 400
+    assert client.get("/export/weather?station=1").status_code == 400
+    response = client.get("/export/stations?since=2025-04-14")
+    assert response.status_code == 400
+    assert "cannot be filtered by time" in response.get_json()["error"]
+    assert "X-Next-Cursor" not in client.get("/export/stations?station=1").headers
@@ -0,0 +1,60 @@
+# Tests for the precomputed forecast grid. To run type "python -m pytest testing/test_forecast_grid.py -v" from the directory where "app.py" is located.
+from datetime import datetime, timedelta
+from forecast_grid import ForecastGrid
+
+NOW = datetime(2025, 4, 14, 10, 20)
+
+# Fake batch predictor: the prediction encodes the station and hour so lookups can be checked.
+def fake_compute(items, now):
+    results = []
+    for station_id, date_time in items:
+        if station_id == 3:
+            results.append({"error": "Station ID 3 does not exist."})
+        else:
+            results.append({"predicted_available_bikes": station_id * 100 + date_time.hour})
+    return results
+
+def make_grid():
+    grid = ForecastGrid(fake_compute, lambda: [1, 2, 3], hours=48, live_horizon=6 * 3600)
+    grid.refresh(NOW)
+    return grid
+
+# Testing that lookups inside the grid return the precomputed value for that hour.
+def test_grid_hit():
+    grid = make_grid()
+    assert grid.lookup(2, datetime(2025, 4, 14, 13, 45), NOW) == 213
+    assert grid.lookup(1, datetime(2025, 4, 15, 20, 0), NOW) == 120
+    assert grid.stats()["hits"] == 2
+
+# Testing that times outside the grid and unknown or failed stations fall back to live inference.
+def test_grid_misses():
+    grid = make_grid()
+    assert grid.lookup(1, NOW + timedelta(hours=60), NOW) is None
+    assert grid.lookup(1, NOW - timedelta(hours=2), NOW) is None
+    assert grid.lookup(99, NOW, NOW) is None
+    assert grid.lookup(3, NOW, NOW) is None
+
+# Testing that a cell computed from historical data is not served once live data would be used.
+def test_grid_respects_live_horizon():
+    grid = make_grid()
+    slot = datetime(2025, 4, 14, 17, 0)
+    assert grid.lookup(1, slot, NOW) == 117
+    assert grid.lookup(1, slot, NOW + timedelta(hours=1)) is None
+
+# Testing that an empty grid always misses.
+def test_grid_empty():
+    grid = ForecastGrid(fake_compute, lambda: [1])
+    assert grid.lookup(1, NOW, NOW) is None
+
+# Testing that a source update during a build makes the grid stale instead of labelling it with the new version.
+def test_grid_source_changes_during_build():
+    versions = [1]
+
+    def compute(items, now):
+        versions[0] = 2
+        return fake_compute(items, now)
+
+    grid = ForecastGrid(compute, lambda: [1], hours=2, source_version=lambda: versions[0])
+    grid.refresh()
+    grid.refresh_if_stale()
+    assert grid.stats()["refreshes"] == 2
@@ -0,0 +1,75 @@
+# Tests for the compiled RandomForest engine. To run type "python -m pytest testing/test_forest_engine.py -v" from the directory where "app.py" is located.
+import pickle
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from forest_engine import CompiledForest
+from model_registry import ModelRegistry
+
+FEATURES = ['num_docks_available', 'day', 'hour', 'avg_air_temp', 'avg_humidity', 'day_name']
+
+# Random rows in the shape of the station model features.
+def random_rows(n, seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'num_docks_available': rng.integers(0, 40, n),
+        'day': rng.integers(1, 29, n),
+        'hour': rng.integers(0, 24, n),
+        'avg_air_temp': rng.uniform(-2, 25, n),
+        'avg_humidity': rng.uniform(40, 100, n),
+        'day_name': rng.integers(0, 7, n),
+    })
+
+# Fixture with a small forest trained on synthetic data.
+@pytest.fixture
+def forest_model():
+    X = random_rows(500, 0)
+    y = X['num_docks_available'] * 0.5 + X['hour'] - X['avg_humidity'] / 10
+    model = RandomForestRegressor(n_estimators=20, random_state=0)
+    model.fit(X, y)
+    return model
+
+# Testing that compiled predictions are identical to scikit-learn's.
+def test_compiled_forest_matches_sklearn(forest_model):
+    forest = CompiledForest.from_sklearn(forest_model)
+    rows = random_rows(200, 1)
+    assert np.array_equal(forest.predict(rows), forest_model.predict(rows))
+
+# Testing that DataFrame columns are reordered to the training feature order.
+def test_compiled_forest_reorders_columns(forest_model):
+    forest = CompiledForest.from_sklearn(forest_model)
+    rows = random_rows(10, 2)
+    shuffled = rows[list(reversed(FEATURES))]
+    assert np.array_equal(forest.predict(shuffled), forest_model.predict(rows))
+
+# Testing a save/load round trip.
+def test_compiled_forest_round_trip(forest_model, tmp_path):
+    path = tmp_path / "station_1.npz"
+    CompiledForest.from_sklearn(forest_model).save(path)
+    rows = random_rows(50, 3)
+    assert np.array_equal(CompiledForest.load(path).predict(rows), forest_model.predict(rows))
+
+# Testing that the registry prefers a compiled model over the pickle.
+def test_registry_loads_compiled_model(forest_model, tmp_path):
+    model_dir = tmp_path / "models"
+    compiled_dir = tmp_path / "compiled"
+    model_dir.mkdir()
+    compiled_dir.mkdir()
+    with open(model_dir / "station_1.pkl", "wb") as file:
+        pickle.dump(forest_model, file)
+    CompiledForest.from_sklearn(forest_model).save(compiled_dir / "station_1.npz")
+
+    registry = ModelRegistry(str(model_dir), compiled_dir=str(compiled_dir))
+    assert isinstance(registry.get(1), CompiledForest)
+
+# Testing that only station model pickles are compiled.
+def test_compile_directory_only_station_models(forest_model, tmp_path):
+    from forest_engine import compile_directory
+    model_dir = tmp_path / "models"
+    model_dir.mkdir()
+    for name in ("station_1.pkl", "scaler.pkl"):
+        with open(model_dir / name, "wb") as file:
+            pickle.dump(forest_model, file)
+    compiled = compile_directory(str(model_dir), str(tmp_path / "compiled"))
+    assert [path.split("/")[-1] for path in compiled] == ["station_1.npz"]
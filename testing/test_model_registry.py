@@ -0,0 +1,74 @@
+# Tests for the in-process model registry. To run type "python -m pytest testing/test_model_registry.py -v" from the directory where "app.py" is located.
+import pickle
+import pytest
+from model_registry import ModelRegistry, parse_preload_setting
+
+# Fixture that writes three small pickled "models" into a temporary directory.
+@pytest.fixture
+def model_dir(tmp_path):
+    for station_id in [1, 2, 3]:
+        with open(tmp_path / f"station_{station_id}.pkl", "wb") as file:
+            pickle.dump({"station": station_id}, file)
+    return tmp_path
+
+# Testing that a repeat lookup is served from the cache.
+def test_registry_hit_after_miss(model_dir):
+    registry = ModelRegistry(str(model_dir), max_models=2)
+    first = registry.get(1)
+    second = registry.get(1)
+    assert first is second
+    stats = registry.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["loads"] == 1
+
+# Testing that the least recently used model is evicted when the cache is full.
+def test_registry_evicts_least_recently_used(model_dir):
+    registry = ModelRegistry(str(model_dir), max_models=2)
+    registry.get(1)
+    registry.get(2)
+    registry.get(1)
+    registry.get(3)
+    assert registry.stats()["evictions"] == 1
+    registry.get(1)
+    assert registry.stats()["loads"] == 3
+    registry.get(2)
+    assert registry.stats()["loads"] == 4
+
+# Testing that the byte budget also bounds the cache.
+def test_registry_byte_limit(model_dir):
+    size = (model_dir / "station_1.pkl").stat().st_size
+    registry = ModelRegistry(str(model_dir), max_bytes=size * 2)
+    registry.preload()
+    assert registry.stats()["cached_models"] == 2
+    assert registry.stats()["cached_bytes"] <= size * 2
+
+# Testing that unknown stations raise FileNotFoundError.
+def test_registry_missing_station(model_dir):
+    registry = ModelRegistry(str(model_dir))
+    with pytest.raises(FileNotFoundError):
+        registry.get(999)
+
+# Testing that pickles which are not station models are skipped when listing stations.
+def test_registry_skips_non_numeric_files(model_dir):
+    with open(model_dir / "station_old.pkl", "wb") as file:
+        pickle.dump({"station": "old"}, file)
+    registry = ModelRegistry(str(model_dir))
+    assert registry.available_station_ids() == [1, 2, 3]
+    registry.preload()
+    assert registry.stats()["cached_models"] == 3
+
+# Testing that per-station load locks are dropped once the load finishes.
+def test_registry_releases_station_locks(model_dir):
+    registry = ModelRegistry(str(model_dir), max_models=1)
+    for station_id in [1, 2, 3, 1]:
+        registry.get(station_id)
+    with pytest.raises(FileNotFoundError):
+        registry.get(999)
+    assert registry._station_locks == {}
+
+# Testing the MODEL_PRELOAD setting parser.
+def test_parse_preload_setting():
+    assert parse_preload_setting(None) is None
+    assert parse_preload_setting("ALL") == "all"
+    assert parse_preload_setting("1, 5,10") == [1, 5, 10]
@@ -0,0 +1,52 @@
+# Tests for the memory-mapped model store. To run type "python -m pytest testing/test_model_store.py -v" from the directory where "app.py" is located.
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from forest_engine import CompiledForest
+from model_registry import ModelRegistry
+from model_store import ModelStore, build_store
+
+# Fixture that packs two small forests into a store file.
+@pytest.fixture
+def store_and_models(tmp_path):
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.uniform(0, 30, (200, 3)), columns=["a", "b", "c"])
+    models = {}
+    for station_id in [4, 7]:
+        model = RandomForestRegressor(n_estimators=10, random_state=station_id)
+        model.fit(X, X["a"] * station_id + X["b"])
+        models[station_id] = model
+    path = str(tmp_path / "models.bin")
+    build_store({sid: CompiledForest.from_sklearn(m) for sid, m in models.items()}, path)
+    return ModelStore(path), models, X
+
+# Testing that models read from the store predict exactly like the originals.
+def test_store_predictions_match(store_and_models):
+    store, models, X = store_and_models
+    assert store.station_ids() == [4, 7]
+    for station_id, model in models.items():
+        assert np.array_equal(store.get(station_id).predict(X), model.predict(X))
+
+# Testing that store arrays are views over the mapped file rather than copies.
+def test_store_arrays_are_not_copied(store_and_models):
+    store, _, _ = store_and_models
+    forest = store.get(4)
+    for array in (forest.threshold, forest.is_leaf):
+        assert not array.flags.owndata
+        assert not array.flags.writeable
+    assert np.array_equal(forest.is_leaf, forest.left == np.arange(len(forest.left)))
+
+# Testing that unknown stations raise FileNotFoundError.
+def test_store_missing_station(store_and_models):
+    store, _, _ = store_and_models
+    with pytest.raises(FileNotFoundError):
+        store.get(99)
+
+# Testing that the registry serves models from the store.
+def test_registry_uses_store(store_and_models, tmp_path):
+    store, _, _ = store_and_models
+    registry = ModelRegistry(str(tmp_path), store=store)
+    assert registry.available_station_ids() == [4, 7]
+    assert isinstance(registry.get(7), CompiledForest)
+    assert registry.stats()["store_version"] == store.version
@@ -0,0 +1,56 @@
+# Tests for the scraper scheduler. To run type "python -m pytest testing/test_scheduler.py -v" from the directory where "app.py" is located.
+import asyncio
+import threading
+import time
+from data_scraping.scheduler import Job, Scheduler
+
+# Runs a scheduler in a background thread for a while and then stops it.
+def run_for(scheduler, seconds):
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_until_complete, args=(scheduler.run(),))
+    thread.start()
+    time.sleep(seconds)
+    loop.call_soon_threadsafe(scheduler.stop)
+    thread.join(5)
+    loop.close()
+    assert not thread.is_alive()
+
+# Testing that slots are aligned to the clock rather than to the end of the previous run.
+def test_next_slot_is_on_the_grid():
+    job = Job("job", lambda: None, interval=300, offset=10)
+    assert job.next_slot(1000) == 1210
+    assert job.next_slot(1210) == 1510
+    assert job.next_slot(1209.9) == 1210
+
+# Testing that a slow job does not drift the cadence.
+def test_scheduler_runs_on_cadence():
+    starts = []
+    job = Job("job", lambda: (starts.append(time.time()), time.sleep(0.05)), interval=0.2)
+    run_for(Scheduler([job], run_immediately=False), 0.9)
+    assert len(starts) >= 3
+    phases = [start % 0.2 for start in starts]
+    assert max(phases) < 0.05
+
+# Testing that failures back off exponentially instead of spinning.
+def test_scheduler_backs_off_after_failures():
+    calls = []
+
+    def failing():
+        calls.append(time.time())
+        raise RuntimeError("upstream down")
+
+    job = Job("job", failing, interval=10, retry_seconds=0.1)
+    run_for(Scheduler([job]), 0.7)
+    assert 2 <= len(calls) <= 4
+    assert job.failures == len(calls)
+    gaps = [b - a for a, b in zip(calls, calls[1:])]
+    assert all(gap >= 0.05 for gap in gaps)
+
+# Testing that a slot is skipped while the previous run is still going, and that stop waits for it.
+def test_scheduler_concurrency_limit_and_shutdown():
+    finished = []
+    job = Job("job", lambda: (time.sleep(0.45), finished.append(True)), interval=0.2)
+    run_for(Scheduler([job], shutdown_timeout=2), 0.3)
+    assert job.skipped >= 1
+    assert finished == [True]
+    assert job.running == 0
@@ -0,0 +1,56 @@
+# Tests for the scrapers' local write-ahead spool. To run type "python -m pytest testing/test_spool.py -v" from the directory where "app.py" is located.
+import pytest
+from data_scraping.spool import Spool
+
+@pytest.fixture
+def spool(tmp_path):
+    spool = Spool(str(tmp_path / "spool.sqlite3"))
+    yield spool
+    spool.close()
+
+# Testing that rows are drained oldest first in bounded batches.
+def test_spool_flush_in_batches(spool):
+    spool.append({"station": [(1, "A")], "availability": [(1, 5), (1, 6)]})
+    spool.append({"availability": [(1, 7)]})
+    batches = []
+    assert spool.flush(batches.append, batch_size=3) == 4
+    assert batches == [{"station": [(1, "A")], "availability": [(1, 5), (1, 6)]}, {"availability": [(1, 7)]}]
+    assert len(spool) == 0
+
+# Testing that a failed write leaves the batch spooled, and that rows survive reopening the file.
+def test_spool_keeps_rows_after_failure(spool, tmp_path):
+    spool.append({"availability": [(1, 5), (2, 6)]})
+
+    def failing(rows_by_kind):
+        raise RuntimeError("MySQL is down")
+
+    assert spool.flush(failing) == 0
+    spool.close()
+
+    reopened = Spool(str(tmp_path / "spool.sqlite3"))
+    written = []
+    assert reopened.flush(written.append) == 2
+    assert written == [{"availability": [(1, 5), (2, 6)]}]
+    reopened.close()
+
+# Testing that a row rejected for its data does not block the rows behind it and is dead-lettered after max_attempts.
+def test_spool_poison_row(tmp_path):
+    import sqlite3
+    spool = Spool(str(tmp_path / "spool.sqlite3"), max_attempts=2)
+    spool.append({"availability": [(1, 5), (99, 6), (2, 7)]})
+    written = []
+
+    def write(rows_by_kind):
+        if any(row[0] == 99 for row in rows_by_kind["availability"]):
+            raise sqlite3.IntegrityError("FOREIGN KEY constraint failed")
+        written.extend(rows_by_kind["availability"])
+
+    assert spool.flush(write) == 2
+    assert written == [(1, 5), (2, 7)]
+    assert len(spool) == 1
+
+    spool.append({"availability": [(3, 8)]})
+    assert spool.flush(write, batch_size=1) == 1
+    assert len(spool) == 0
+    assert spool.dead_letters() == [("availability", (99, 6), "FOREIGN KEY constraint failed")]
+    spool.close()
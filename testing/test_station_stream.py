@@ -0,0 +1,82 @@
+# Tests for the Server-Sent Events station stream. To run type "python -m pytest testing/test_station_stream.py -v" from the directory where "app.py" is located.
+import json
+from station_snapshot import StationSnapshot
+from station_stream import StationStream
+from upstream_cache import Snapshot
+
+# Builds a one-station-per-entry feed from {number: available_bikes}.
+def make_feed(bikes):
+    return [
+        {"number": number, "name": f"Station {number}", "status": "OPEN", "bike_stands": 20,
+         "available_bikes": count, "available_bike_stands": 20 - count, "position": {"lat": 53.3, "lng": -6.2}}
+        for number, count in bikes.items()
+    ]
+
+# Source returning whatever feed the test last set, versioned like SnapshotCache.
+class FakeSource:
+    def __init__(self, bikes):
+        self.version = 0
+        self.set(bikes)
+
+    def set(self, bikes):
+        self.version += 1
+        self.snapshot = Snapshot(StationSnapshot(make_feed(bikes)), 0, self.version)
+
+    def __call__(self):
+        return self.snapshot
+
+# Splits SSE text into (id, event, data) tuples, skipping retry and comment lines.
+def parse_events(chunks):
+    events = []
+    for chunk in chunks:
+        fields = dict(line.split(": ", 1) for line in chunk.strip().split("\n") if not line.startswith(":"))
+        if "event" in fields:
+            events.append((int(fields["id"]), fields["event"], json.loads(fields["data"])))
+    return events
+
+# Testing that only stations whose availability changed end up in a delta.
+def test_poll_emits_only_changed_stations():
+    source = FakeSource({1: 5, 2: 7})
+    stream = StationStream(source)
+    assert stream.poll() is None
+
+    source.set({1: 5, 2: 3})
+    event = stream.poll()
+    data = json.loads(event.data)
+    assert event.id == 1
+    assert [station["number"] for station in data["changed"]] == [2]
+    assert data["changed"][0]["available_bikes"] == 3
+    assert data["removed"] == []
+
+    # Same version again means no work and no event.
+    assert stream.poll() is None
+    assert stream.last_id == 1
+
+# Testing that a reconnecting client gets the missed deltas, and a new or too-old one gets a snapshot.
+def test_resume_from_last_event_id():
+    source = FakeSource({1: 5, 2: 7})
+    stream = StationStream(source, buffer_size=2)
+    stream.poll()
+    for count in (4, 3, 2):
+        source.set({1: count, 2: 7})
+        stream.poll()
+
+    assert [event.id for event in stream.events_since(2)] == [3]
+    assert stream.events_since(3) == []
+    assert stream.events_since(None) is None
+    assert stream.events_since(0) is None
+
+    subscriber = stream.subscribe(last_id=2)
+    events = parse_events([next(subscriber), next(subscriber)])
+    assert events == [(3, "delta", {"changed": [json.loads(stream.events[-1].data)["changed"][0]], "removed": []})]
+
+    fresh = stream.subscribe()
+    events = parse_events([next(fresh), next(fresh)])
+    assert events[0][0] == 3 and events[0][1] == "snapshot"
+    assert events[0][2]["available_bikes"] == [2, 7]
+
+    assert stream.stats()["clients"] == 2
+    subscriber.close()
+    fresh.close()
+    stream.stop()
+    assert stream.stats()["clients"] == 0
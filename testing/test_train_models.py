@@ -0,0 +1,41 @@
+# Tests for the command-line training pipeline. To run type "python -m pytest testing/test_train_models.py -v" from the directory where "app.py" is located.
+import json
+import pickle
+import pytest
+from machine_learning.train_models import FEATURES, partition_by_station, train_all
+
+# Testing that the data is partitioned by station with only the model columns.
+def test_partition_by_station(cleaned_csv):
+    partitions = partition_by_station(cleaned_csv)
+    assert sorted(partitions) == [1, 2, 3]
+    assert list(partitions[1].columns) == FEATURES + ["num_bikes_available"]
+
+# Testing that parallel training writes every model and a manifest, and is reproducible.
+@pytest.mark.parametrize("workers", [1, 2])
+def test_train_all_writes_models_and_manifest(cleaned_csv, tmp_path, workers):
+    out_dir = tmp_path / f"models_{workers}"
+    params = {"n_estimators": 5, "max_depth": None, "min_samples_leaf": 1, "n_jobs": 1}
+    manifest = train_all(partition_by_station(cleaned_csv), str(out_dir), params, workers=workers)
+
+    assert sorted(manifest["stations"]) == ["1", "2", "3"]
+    assert all("mae" in metrics and "train_seconds" in metrics for metrics in manifest["stations"].values())
+    assert json.loads((out_dir / "manifest.json").read_text())["stations"] == manifest["stations"]
+
+    with open(out_dir / "station_1.pkl", "rb") as file:
+        model = pickle.load(file)
+    assert list(model.feature_names_in_) == FEATURES
+
+    again = train_all(partition_by_station(cleaned_csv), str(tmp_path / "again"), params, workers=1)
+    assert again["stations"]["1"]["mae"] == manifest["stations"]["1"]["mae"]
+
+# Testing that a station that fails to train is reported in the manifest without stopping the others.
+@pytest.mark.parametrize("workers", [1, 2])
+def test_train_all_records_failures(cleaned_csv, tmp_path, workers):
+    partitions = partition_by_station(cleaned_csv)
+    partitions[4] = partitions[1].iloc[0:0]
+    params = {"n_estimators": 5, "max_depth": None, "min_samples_leaf": 1, "n_jobs": 1}
+    manifest = train_all(partitions, str(tmp_path / "models"), params, workers=workers)
+
+    assert sorted(manifest["stations"]) == ["1", "2", "3"]
+    assert list(manifest["failures"]) == ["4"]
+    assert not (tmp_path / "models" / "station_4.pkl").exists()
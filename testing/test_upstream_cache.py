@@ -0,0 +1,57 @@
+# Tests for the shared upstream snapshot cache. To run type "python -m pytest testing/test_upstream_cache.py -v" from the directory where "app.py" is located.
+import threading
+import time
+import pytest
+from upstream_cache import SnapshotCache
+
+# Fetch function that counts calls and can be slowed down.
+class CountingFetch:
+    def __init__(self, delay=0.0):
+        self.calls = 0
+        self.delay = delay
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        return [{"number": 1, "available_bikes": self.calls}]
+
+# Testing that values are reused within the TTL.
+def test_cache_hit_within_ttl():
+    fetch = CountingFetch()
+    cache = SnapshotCache(fetch, ttl=60)
+    assert cache.get().value == cache.get().value
+    assert fetch.calls == 1
+
+# Testing that concurrent misses share a single in-flight fetch.
+def test_cache_single_flight():
+    fetch = CountingFetch(delay=0.2)
+    cache = SnapshotCache(fetch, ttl=60)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert fetch.calls == 1
+    assert len(results) == 8
+
+# Testing that stale data is served while one background fetch revalidates it.
+def test_cache_stale_while_revalidate():
+    fetch = CountingFetch(delay=0.1)
+    cache = SnapshotCache(fetch, ttl=0.05, stale_ttl=60)
+    first = cache.get()
+    time.sleep(0.1)
+    stale = cache.get()
+    assert stale is first
+    time.sleep(0.3)
+    assert cache.peek_version() == 2
+    assert fetch.calls == 2
+
+# Testing that fetch errors reach the caller when there is no usable cached value.
+def test_cache_error_without_data():
+    def failing():
+        raise Exception("API request failed: 503")
+    cache = SnapshotCache(failing, ttl=60)
+    with pytest.raises(Exception):
+        cache.get()
+    assert cache.stats()["errors"] == 1
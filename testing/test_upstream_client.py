@@ -0,0 +1,74 @@
+# Tests for the pooled upstream HTTP client. To run type "python -m pytest testing/test_upstream_client.py -v" from the directory where "app.py" is located.
+from unittest.mock import MagicMock
+import pytest
+import requests
+from upstream_client import CircuitBreaker, CircuitOpenError, UpstreamClient
+
+# Client whose session returns the given responses (or raises the given exceptions) in order.
+def make_client(outcomes, **options):
+    options.setdefault("backoff", 0.001)
+    client = UpstreamClient("test", **options)
+    responses = []
+    for outcome in outcomes:
+        if isinstance(outcome, int):
+            response = MagicMock()
+            response.status_code = outcome
+            responses.append(response)
+        else:
+            responses.append(outcome)
+    client.session.get = MagicMock(side_effect=responses)
+    return client
+
+# Testing that transient errors are retried until a good response arrives.
+def test_client_retries_transient_errors():
+    client = make_client([requests.exceptions.ConnectionError("reset"), 503, 200], retries=2)
+    assert client.get("https://example.com").status_code == 200
+    assert client.session.get.call_count == 3
+
+# Testing that retries are bounded and the last error is raised.
+def test_client_gives_up_after_retries():
+    client = make_client([requests.exceptions.Timeout("slow")] * 3, retries=1)
+    with pytest.raises(requests.exceptions.Timeout):
+        client.get("https://example.com")
+    assert client.session.get.call_count == 2
+
+# Testing that client errors are returned without retrying.
+def test_client_does_not_retry_client_errors():
+    client = make_client([403])
+    assert client.get("https://example.com").status_code == 403
+    assert client.session.get.call_count == 1
+
+# Testing that every attempt gets a timeout.
+def test_client_passes_timeout():
+    client = make_client([200], timeout=(1.0, 2.0))
+    client.get("https://example.com")
+    assert client.session.get.call_args.kwargs["timeout"] == (1.0, 2.0)
+
+# Testing that the breaker opens after repeated failures and fails fast.
+def test_circuit_breaker_fails_fast():
+    client = make_client([500] * 4, retries=0, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+    client.get("https://example.com")
+    client.get("https://example.com")
+    with pytest.raises(CircuitOpenError):
+        client.get("https://example.com")
+    assert client.session.get.call_count == 2
+
+# Testing that a half-open breaker closes again after a successful trial call.
+def test_circuit_breaker_recovers():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+# Testing that a half-open trial failing with a non-retryable error releases the trial instead of locking the breaker.
+def test_circuit_breaker_trial_other_error():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    client = make_client([requests.exceptions.ChunkedEncodingError("truncated"), 200], breaker=breaker)
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        client.get("https://example.com")
+    assert client.session.get.call_count == 1
+    assert client.get("https://example.com").status_code == 200
+    assert breaker.state == "closed"
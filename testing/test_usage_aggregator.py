@@ -0,0 +1,51 @@
+# Tests for the incremental station usage aggregator. To run type "python -m pytest testing/test_usage_aggregator.py -v" from the directory where "app.py" is located.
+from datetime import datetime, timedelta
+import pandas as pd
+from data_scraping.usage_aggregator import UsageAggregator, open_aggregator
+from usage_cube import UsageCube
+
+MONDAY_8AM = datetime(2025, 4, 14, 8, 5)
+
+# Testing that averages are kept per station, weekday and hour.
+def test_aggregator_running_average():
+    aggregator = UsageAggregator()
+    aggregator.update([{"number": 3, "available_bike_stands": 10}], MONDAY_8AM)
+    aggregator.update([{"number": 3, "available_bike_stands": 20}], MONDAY_8AM + timedelta(minutes=5))
+    aggregator.update([{"number": 3, "available_bike_stands": 7}], MONDAY_8AM + timedelta(hours=1))
+    frame = aggregator.to_frame()
+    assert frame.values.tolist() == [[3, 0, 8, 15.0], [3, 0, 9, 7.0]]
+
+# Testing that exponential decay weights newer observations more.
+def test_aggregator_decay():
+    aggregator = UsageAggregator(half_life_hours=24 * 7)
+    aggregator.add(1, 0, MONDAY_8AM)
+    aggregator.add(1, 30, MONDAY_8AM + timedelta(days=7))
+    assert aggregator.to_frame()["avg_docks"][0] == 20.0
+
+# Testing that the CSV is readable by the app's usage cube and that state survives a restart.
+def test_aggregator_persistence(tmp_path):
+    aggregator = UsageAggregator()
+    aggregator.add(2, 12, MONDAY_8AM)
+    aggregator.save_csv(str(tmp_path / "usage.csv"))
+    aggregator.save_state(str(tmp_path / "state.npz"))
+    assert UsageCube.from_csv(str(tmp_path / "usage.csv")).get(2, 0, 8) == 12
+
+    resumed = open_aggregator(str(tmp_path / "state.npz"))
+    resumed.add(2, 6, MONDAY_8AM)
+    assert resumed.to_frame()["avg_docks"][0] == 9.0
+
+# Testing that the aggregator can be seeded from the existing averages CSV.
+def test_aggregator_seeded_from_csv(tmp_path):
+    path = tmp_path / "usage.csv"
+    pd.DataFrame({"station_id": [5], "day_name": [0], "hour": [8], "avg_docks": [10.0]}).to_csv(path, index=False)
+    aggregator = open_aggregator(str(tmp_path / "missing.npz"), str(path), seed_weight=3)
+    aggregator.add(5, 30, MONDAY_8AM)
+    assert aggregator.to_frame()["avg_docks"][0] == 15.0
+
+# Testing that with the default seed weight one live sample barely moves a seeded average.
+def test_aggregator_seed_outweighs_one_sample(tmp_path):
+    path = tmp_path / "usage.csv"
+    pd.DataFrame({"station_id": [5], "day_name": [0], "hour": [8], "avg_docks": [10.0]}).to_csv(path, index=False)
+    aggregator = open_aggregator(str(tmp_path / "missing.npz"), str(path))
+    aggregator.add(5, 30, MONDAY_8AM)
+    assert 10.0 < aggregator.to_frame()["avg_docks"][0] < 10.5
@@ -9,10 +9,11 @@ from app import (
     load_station_model
 )
 from unittest.mock import patch, MagicMock
+from usage_cube import UsageCube
 import pandas as pd
 import os
 
-# Fixture to mock avg_usage_df used in get_historical_average_docks.
+# Fixture to mock the historical usage cube used in get_historical_average_docks.
 @pytest.fixture(autouse=True)
 def patch_avg_usage(monkeypatch):
     test_df = pd.DataFrame({
@@ -21,7 +22,7 @@ def patch_avg_usage(monkeypatch):
         'hour': [8, 9],
         'avg_docks': [5, 10]
     })
-    monkeypatch.setattr("app.avg_usage_df", test_df)
+    monkeypatch.setattr("app.avg_usage", UsageCube.from_frame(test_df))
 
 # Testing that the function returns correct dock count when matching entry is found.
 def test_get_historical_average_docks_hit():
@@ -31,6 +32,22 @@ def test_get_historical_average_docks_hit():
 def test_get_historical_average_docks_miss():
     assert get_historical_average_docks(99, 6, 20) == 0
 
+# Testing that vectorised lookups match single lookups and return 0 for missing cells.
+def test_usage_cube_get_many():
+    import app
+    result = app.avg_usage.get_many([1, 1, 1, 99, -1], [0, 1, 2, 0, 0], [8, 9, 8, 8, 8])
+    assert list(result) == [5, 10, 0, 0, 0]
+
+# Testing that the cube reloads when the CSV is regenerated.
+def test_usage_cube_reload(tmp_path):
+    path = tmp_path / "usage.csv"
+    pd.DataFrame({'station_id': [2], 'day_name': [3], 'hour': [4], 'avg_docks': [6.7]}).to_csv(path, index=False)
+    cube = UsageCube.from_csv(str(path))
+    assert cube.get(2, 3, 4) == 6
+    pd.DataFrame({'station_id': [2], 'day_name': [3], 'hour': [4], 'avg_docks': [9.1]}).to_csv(path, index=False)
+    assert cube.reload_if_changed(force=True)
+    assert cube.get(2, 3, 4) == 9
+
 # Testing that the function returns the correct dock count when the station is found.
 def test_get_station_available_docks_found():
     data = [{'number': 123, 'available_bike_stands': 7}]
@@ -42,7 +59,7 @@ def test_get_station_available_docks_not_found():
     assert get_station_available_docks(123, data) == 0
 
 # Testing that the live bike data fetch succeeds and returns parsed JSON when API is available.
-@patch("app.requests.get")
+@patch("app.jcdecaux_client.get")
 def test_fetch_live_bike_data_success(mock_get):
     mock_response = MagicMock()
     mock_response.status_code = 200
@@ -54,7 +71,7 @@ def test_fetch_live_bike_data_success(mock_get):
     assert data[0]["number"] == 123
 
 # Testing that the function raises exception if API returns a failure status.
-@patch("app.requests.get")
+@patch("app.jcdecaux_client.get")
 def test_fetch_live_bike_data_fail(mock_get):
     mock_response = MagicMock()
     mock_response.status_code = 403
@@ -64,7 +81,7 @@ def test_fetch_live_bike_data_fail(mock_get):
         fetch_live_bike_data_dublin()
 
 # Testing that the weather forecast function correctly parses temperature and humidity from mocked API data.
-@patch("app.requests.get")
+@patch("app.openweathermap_client.get")
 def test_get_weather_forecast_dublin(mock_get):
     mock_response = MagicMock()
     mock_response.json.return_value = {
@@ -78,6 +95,34 @@ def test_get_weather_forecast_dublin(mock_get):
     assert "temperature" in result
     assert "humidity" in result
 
+# Testing that the forecast is fetched once and reused for later lookups.
+@patch("app.openweathermap_client.get")
+def test_get_weather_forecast_dublin_cached(mock_get):
+    mock_get.return_value.json.return_value = {
+        "list": [
+            {"dt": 1713070800, "main": {"temp": 12.5, "humidity": 82}},
+            {"dt": 1713081600, "main": {"temp": 14.0, "humidity": 70}}
+        ]
+    }
+    get_weather_forecast_dublin("2025-04-14")
+    get_weather_forecast_dublin("2025-04-15")
+    assert mock_get.call_count == 1
+
+# Testing that binary-search lookups pick the same entry as the original min() scan.
+def test_forecast_index_matches_linear_scan():
+    from datetime import datetime, timedelta
+    from weather_forecast import ForecastIndex
+    forecast = [
+        {"dt": 1744600000 + i * 10800, "main": {"temp": float(i), "humidity": 50 + i}}
+        for i in range(40)
+    ]
+    index = ForecastIndex.from_forecast(forecast)
+    targets = [datetime(2025, 4, 13) + timedelta(hours=h) for h in range(0, 24 * 7, 5)]
+    for target in targets:
+        expected = min(forecast, key=lambda x: abs(datetime.fromtimestamp(x["dt"]) - target))
+        assert index.closest(target)["temperature"] == expected["main"]["temp"]
+    assert [w["temperature"] for w in index.closest_many(targets)] == [index.closest(t)["temperature"] for t in targets]
+
 # Testing the predict availability using mocks for model, weather, and live bike data.
 @patch("app.load_station_model")
 @patch("app.get_weather_forecast_dublin")
@@ -97,7 +142,7 @@ def test_load_station_model_file_not_found(mock_exists):
         load_station_model(999)
 
 # Testing that the weather forecast raises error if API returns no list data.
-@patch("app.requests.get")
+@patch("app.openweathermap_client.get")
 def test_weather_forecast_no_data(mock_get):
     mock_get.return_value.json.return_value = {"list": []}
     with pytest.raises(ValueError):
@@ -123,4 +168,63 @@ def test_predict_uses_historical_data(mock_weather, mock_model):
     mock_weather.return_value = {"temperature": 18, "humidity": 60}
     prediction = predict_bike_availability(1, "2030-01-01", "12:00:00")
     assert isinstance(prediction, int)
-    assert prediction == 7
\ No newline at end of file
+    assert prediction == 7
+
+# Testing that concurrent and sequential prediction modes give the same result.
+@patch("app.load_station_model")
+@patch("app.get_weather_forecast_dublin")
+@patch("app.fetch_live_bike_data_dublin")
+def test_predict_concurrent_matches_sequential(mock_fetch, mock_weather, mock_model):
+    mock_model.return_value.predict.side_effect = lambda df: [df["num_docks_available"][0] + df["avg_air_temp"][0]]
+    mock_weather.return_value = {"temperature": 15, "humidity": 80}
+    mock_fetch.return_value = [{"number": 1, "available_bike_stands": 5}]
+    sequential = predict_bike_availability(1, "2025-04-14", "12:00", concurrent=False)
+    concurrent = predict_bike_availability(1, "2025-04-14", "12:00", concurrent=True)
+    assert sequential == concurrent == 20
+
+# Testing that the model load and upstream fetches overlap in concurrent mode.
+@patch("app.load_station_model")
+@patch("app.get_weather_forecast_dublin")
+@patch("app.fetch_live_bike_data_dublin")
+def test_predict_concurrent_overlaps_waits(mock_fetch, mock_weather, mock_model):
+    import time
+
+    def slow(value):
+        def wait(*args):
+            time.sleep(0.2)
+            return value
+        return wait
+
+    model = MagicMock()
+    model.predict.return_value = [2]
+    mock_model.side_effect = slow(model)
+    mock_weather.side_effect = slow({"temperature": 15, "humidity": 80})
+    mock_fetch.side_effect = slow([{"number": 1, "available_bike_stands": 5}])
+
+    start = time.perf_counter()
+    assert predict_bike_availability(1, "2025-04-14", "12:00", concurrent=True) == 2
+    assert time.perf_counter() - start < 0.5
+
+# Testing that a missing model is still reported before an invalid date in concurrent mode.
+@patch("app.os.path.exists", return_value=False)
+def test_predict_concurrent_error_order(mock_exists):
+    with pytest.raises(FileNotFoundError):
+        predict_bike_availability(999, "not-a-date", "12:00", concurrent=True)
+
+# Testing indexed lookups and precomputed projections on a station snapshot.
+def test_station_snapshot():
+    import json
+    from station_snapshot import StationSnapshot
+    raw = [
+        {"number": 1, "name": "A", "status": "OPEN", "available_bike_stands": 4, "position": {"lat": 53.3, "lng": -6.2}},
+        {"number": 2, "name": "B", "status": "CLOSED", "available_bike_stands": 0}
+    ]
+    snapshot = StationSnapshot(raw)
+    assert get_station_available_docks(1, snapshot) == 4
+    assert get_station_available_docks(3, snapshot) == 0
+    assert snapshot.get(1).lat == 53.3
+    assert json.loads(snapshot.stations_json) == [
+        {"name": "A", "id": 1, "status": "OPEN"},
+        {"name": "B", "id": 2, "status": "CLOSED"}
+    ]
+    assert json.loads(snapshot.raw_json) == raw
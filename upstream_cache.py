@@ -0,0 +1,118 @@
+import threading
+import time
+from collections import namedtuple
+
+# One cached upstream response. version only changes when the fetched value differs from the previous one.
+Snapshot = namedtuple("Snapshot", ["value", "fetched_at", "version"])
+
+
+# A fetch shared by every caller that arrives while it is running.
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.snapshot = None
+        self.error = None
+
+
+# TTL cache for a single upstream resource with request coalescing (single-flight).
+# Within ttl the cached value is served as-is. Between ttl and stale_ttl it is still served, and one
+# background fetch revalidates it. Past stale_ttl (or when empty) callers wait on one shared fetch.
+class SnapshotCache:
+    def __init__(self, fetch, ttl, stale_ttl=None, name="upstream"):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl if stale_ttl is not None else ttl
+        self.name = name
+        self._snapshot = None
+        self._flight = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.fetches = 0
+        self.errors = 0
+
+    # Return the current Snapshot, fetching or revalidating as needed.
+    def get(self):
+        with self._lock:
+            snapshot = self._snapshot
+            age = time.time() - snapshot.fetched_at if snapshot else None
+
+            if snapshot is not None and age < self.ttl:
+                self.hits += 1
+                return snapshot
+
+            if snapshot is not None and age < self.stale_ttl:
+                self.stale_hits += 1
+                flight, owner = self._join_flight()
+                if owner:
+                    threading.Thread(target=self._run_flight, args=(flight,), name=f"{self.name}-revalidate",
+                                     daemon=True).start()
+                return snapshot
+
+            self.misses += 1
+            flight, owner = self._join_flight()
+
+        if owner:
+            self._run_flight(flight)
+        else:
+            flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.snapshot
+
+    # Called with the lock held: reuse the running fetch or register a new one.
+    def _join_flight(self):
+        if self._flight is None:
+            self._flight = _Flight()
+            return self._flight, True
+        return self._flight, False
+
+    def _run_flight(self, flight):
+        try:
+            value = self.fetch()
+            with self._lock:
+                self.fetches += 1
+                previous = self._snapshot
+                if previous is not None and previous.value == value:
+                    version = previous.version
+                else:
+                    version = (previous.version + 1) if previous is not None else 1
+                self._snapshot = Snapshot(value, time.time(), version)
+                flight.snapshot = self._snapshot
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            flight.error = e
+            print(f"{self.name} fetch failed: {e}")
+        finally:
+            with self._lock:
+                self._flight = None
+            flight.done.set()
+
+    # Seconds since the cached value was fetched, or None when empty.
+    def age(self):
+        snapshot = self._snapshot
+        return time.time() - snapshot.fetched_at if snapshot else None
+
+    # Version of the cached value without triggering a fetch.
+    def peek_version(self):
+        snapshot = self._snapshot
+        return snapshot.version if snapshot else None
+
+    def clear(self):
+        with self._lock:
+            self._snapshot = None
+
+    def stats(self):
+        return {
+            "age_seconds": self.age(),
+            "version": self.peek_version(),
+            "ttl": self.ttl,
+            "stale_ttl": self.stale_ttl,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "fetches": self.fetches,
+            "errors": self.errors,
+        }
@@ -0,0 +1,131 @@
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+# Status codes worth retrying: rate limiting and transient server errors.
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+# Raised without contacting the upstream while its circuit breaker is open.
+class CircuitOpenError(requests.exceptions.RequestException):
+    pass
+
+
+# Opens after failure_threshold consecutive failures and fails fast for reset_timeout seconds.
+# After that one trial call is let through (half-open); success closes it, failure opens it again.
+class CircuitBreaker:
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    # Whether a call may go ahead right now.
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+# Keep-alive HTTP client for one upstream API, with per-attempt timeouts, an overall deadline,
+# bounded retries with jittered exponential backoff and a circuit breaker.
+class UpstreamClient:
+    def __init__(self, name, timeout=(3.05, 10.0), deadline=20.0, retries=2, backoff=0.5, max_backoff=4.0,
+                 pool_size=10, breaker=None):
+        self.name = name
+        self.timeout = timeout
+        self.deadline = deadline
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    # Timeout for one attempt, shortened so the attempt cannot run past the deadline.
+    def _attempt_timeout(self, remaining):
+        if isinstance(self.timeout, tuple):
+            connect, read = self.timeout
+            return (min(connect, remaining), min(read, remaining))
+        return min(self.timeout, remaining)
+
+    # GET a URL. Returns the final response (callers still check status_code) or raises a
+    # requests exception once retries or the deadline are exhausted.
+    def get(self, url, params=None, deadline=None, **kwargs):
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"{self.name} is unavailable (circuit open)")
+
+        deadline_at = time.monotonic() + (deadline if deadline is not None else self.deadline)
+        attempt = 0
+        while True:
+            remaining = deadline_at - time.monotonic()
+            try:
+                if remaining <= 0:
+                    raise requests.exceptions.Timeout(f"{self.name} request exceeded its deadline")
+                response = self.session.get(url, params=params, timeout=self._attempt_timeout(remaining), **kwargs)
+                if response.status_code not in RETRY_STATUSES:
+                    self.breaker.record_success()
+                    return response
+                error = None
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                response = None
+                error = e
+            except Exception:
+                # Not worth retrying (e.g. a broken response body or an invalid URL), but still a failed
+                # call; recording it also releases a half-open trial so the breaker can close again.
+                self.breaker.record_failure()
+                raise
+
+            # Full jitter: sleep a random time up to the exponential backoff, within the deadline.
+            delay = random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+            if attempt >= self.retries or time.monotonic() + delay >= deadline_at:
+                self.breaker.record_failure()
+                if error is not None:
+                    raise error
+                return response
+            time.sleep(delay)
+            attempt += 1
+
+
+# One shared client per upstream name, so every caller in a process reuses the same connection pool and breaker.
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(name, **options):
+    with _clients_lock:
+        if name not in _clients:
+            _clients[name] = UpstreamClient(name, **options)
+        return _clients[name]
@@ -0,0 +1,87 @@
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+# Stored for (station, weekday, hour) cells with no historical data.
+MISSING = -1.0
+
+# Historical average docks as a dense [station, weekday, hour] array, so lookups are plain indexing.
+class UsageCube:
+    def __init__(self, values, path=None, mtime=None, check_seconds=60):
+        self.values = values
+        self.path = path
+        self.mtime = mtime
+        self.check_seconds = check_seconds
+        self._checked_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    # Build the cube from a DataFrame with station_id, day_name, hour and avg_docks columns.
+    @staticmethod
+    def build_values(df):
+        # Like the original boolean-mask lookup, the first row for a cell wins.
+        df = df.drop_duplicates(subset=["station_id", "day_name", "hour"], keep="first")
+        df = df[df["day_name"].between(0, 6) & df["hour"].between(0, 23) & (df["station_id"] >= 0)]
+        n_stations = int(df["station_id"].max()) + 1 if len(df) else 0
+        values = np.full((n_stations, 7, 24), MISSING, dtype=np.float64)
+        values[
+            df["station_id"].to_numpy(dtype=np.int64),
+            df["day_name"].to_numpy(dtype=np.int64),
+            df["hour"].to_numpy(dtype=np.int64),
+        ] = df["avg_docks"].to_numpy(dtype=np.float64)
+        return values
+
+    @classmethod
+    def from_frame(cls, df):
+        return cls(cls.build_values(df))
+
+    @classmethod
+    def from_csv(cls, path, check_seconds=60):
+        mtime = os.path.getmtime(path)
+        return cls(cls.build_values(pd.read_csv(path)), path, mtime, check_seconds)
+
+    # Average docks for one cell, truncated to int, or 0 when there is no data.
+    def get(self, station_id, day_name, hour):
+        values = self.values
+        if 0 <= station_id < values.shape[0] and 0 <= day_name < 7 and 0 <= hour < 24:
+            value = values[station_id, day_name, hour]
+            if value != MISSING:
+                return int(value)
+        return 0
+
+    # Vectorised get() for arrays of station ids, weekdays and hours.
+    def get_many(self, station_ids, day_names, hours):
+        values = self.values
+        station_ids = np.asarray(station_ids, dtype=np.int64)
+        day_names = np.asarray(day_names, dtype=np.int64)
+        hours = np.asarray(hours, dtype=np.int64)
+
+        valid = (
+            (station_ids >= 0) & (station_ids < values.shape[0]) &
+            (day_names >= 0) & (day_names < 7) &
+            (hours >= 0) & (hours < 24)
+        )
+        result = np.zeros(station_ids.shape, dtype=np.int64)
+        found = values[station_ids[valid], day_names[valid], hours[valid]]
+        result[valid] = np.where(found == MISSING, 0, found).astype(np.int64)
+        return result
+
+    # Rebuild from the CSV if it was regenerated. The file is only stat'ed every check_seconds.
+    def reload_if_changed(self, force=False):
+        if self.path is None:
+            return False
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_seconds:
+            return False
+        with self._lock:
+            self._checked_at = now
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                return False
+            if not force and mtime == self.mtime:
+                return False
+            self.values = self.build_values(pd.read_csv(self.path))
+            self.mtime = mtime
+            return True
@@ -0,0 +1,77 @@
+from bisect import bisect_left
+from datetime import datetime
+import numpy as np
+
+# OpenWeatherMap forecast entries stored as sorted timestamp and value arrays, so the closest
+# forecast slot to a time is a binary search instead of a scan over every entry.
+class ForecastIndex:
+    def __init__(self, timestamps, temperatures, humidities):
+        self.timestamps = timestamps
+        self.temperatures = temperatures
+        self.humidities = humidities
+        self._timestamp_list = timestamps.tolist()
+
+    # Build from the "list" field of the forecast response. A stable sort keeps the
+    # original order of equal timestamps, matching min() picking the first of equal candidates.
+    @classmethod
+    def from_forecast(cls, forecast):
+        timestamps = np.asarray([entry["dt"] for entry in forecast], dtype=np.int64)
+        temperatures = np.asarray([entry["main"]["temp"] for entry in forecast], dtype=np.float64)
+        humidities = np.asarray([entry["main"]["humidity"] for entry in forecast], dtype=np.float64)
+        order = np.argsort(timestamps, kind="stable")
+        return cls(timestamps[order], temperatures[order], humidities[order])
+
+    def __len__(self):
+        return len(self._timestamp_list)
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, ForecastIndex) and
+            np.array_equal(self.timestamps, other.timestamps) and
+            np.array_equal(self.temperatures, other.temperatures) and
+            np.array_equal(self.humidities, other.humidities)
+        )
+
+    # Position of the entry closest to a unix timestamp; ties go to the earlier entry.
+    def closest_position(self, timestamp):
+        if not self._timestamp_list:
+            raise ValueError("Weather forecast has no entries")
+        position = bisect_left(self._timestamp_list, timestamp)
+        if position == 0:
+            return 0
+        if position == len(self._timestamp_list):
+            return position - 1
+        before = self._timestamp_list[position - 1]
+        after = self._timestamp_list[position]
+        return position - 1 if timestamp - before <= after - timestamp else position
+
+    # Vectorised closest_position for an array of unix timestamps.
+    def closest_positions(self, timestamps):
+        if not self._timestamp_list:
+            raise ValueError("Weather forecast has no entries")
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        positions = np.searchsorted(self.timestamps, timestamps, side="left")
+        after = np.clip(positions, 0, len(self) - 1)
+        before = np.clip(positions - 1, 0, len(self) - 1)
+        use_before = (timestamps - self.timestamps[before]) <= (self.timestamps[after] - timestamps)
+        return np.where((positions > 0) & ((positions == len(self)) | use_before), before, after)
+
+    def _features(self, position):
+        return {
+            "temperature": float(self.temperatures[position]),
+            "humidity": float(self.humidities[position]),
+        }
+
+    # Weather features for the forecast slot closest to a datetime.
+    def closest(self, date_time):
+        return self._features(self.closest_position(date_time.timestamp()))
+
+    # Weather features for the forecast slot closest to midnight of a "YYYY-MM-DD" date,
+    # which is what the prediction endpoints have always used.
+    def closest_date(self, date):
+        return self.closest(datetime.strptime(date, "%Y-%m-%d"))
+
+    # closest() for many datetimes at once.
+    def closest_many(self, date_times):
+        positions = self.closest_positions([date_time.timestamp() for date_time in date_times])
+        return [self._features(position) for position in positions]